@@ -15,15 +15,29 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import json
+from contextlib import asynccontextmanager
 
-from agents.meta_agent import LifeOSAgent
+from agents.meta_agent import LifeOSAgent, RunContext
 from usage_tracking import log_agent_invocation, calculate_usage_cost
+from utils.services import get_services
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared service clients, created once and injected into every agent
+services = get_services()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared clients on startup and close them on shutdown"""
+    await services.startup()
+    yield
+    await services.shutdown()
+
+
 # Create FastAPI app
-app = FastAPI(title="dailyAGI Sentient Agent Server")
+app = FastAPI(title="dailyAGI Sentient Agent Server", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -35,7 +49,7 @@ app.add_middleware(
 )
 
 # Initialize MetaAgent
-meta_agent = LifeOSAgent()
+meta_agent = LifeOSAgent(services)
 agent_id = "dailyagi"
 version = "0.1.0"
 
@@ -56,29 +70,31 @@ async def generate_response(message: str, wallet: str):
         # Emit start event
         yield f"data: {json.dumps({'type': 'START', 'content': 'dailyAGI is processing your request…'})}\n\n"
         
+        # Per-request context carries intent, result and timings through the stream
+        context = RunContext(message=message, wallet=wallet)
+        
         # Run MetaAgent with progress tracking
-        async for progress_step in meta_agent.run_with_progress(message, wallet):
+        async for progress_step in meta_agent.run_with_progress(message, wallet, context):
             yield f"data: {json.dumps({'type': 'PROGRESS', 'content': progress_step})}\n\n"
         
         # Get final answer
-        final_answer = await meta_agent.handle_task(message, wallet)
+        final_answer = await meta_agent.handle_task(message, wallet, context)
         
         # Emit final message
         yield f"data: {json.dumps({'type': 'MESSAGE', 'content': final_answer})}\n\n"
         
         # Log usage
         is_premium = False  # Placeholder - check staking contract
-        intent = meta_agent.detect_intent(message)
-        agent_type = intent.get("agent_type", "unknown")
-        cost = calculate_usage_cost(agent_type, is_premium)
+        context.cost = calculate_usage_cost(context.agent_type, is_premium)
         
         log_agent_invocation(
             wallet_address=wallet,
             agent_id=agent_id,
             version=version,
-            cost=cost,
-            agent_type=agent_type
+            cost=context.cost,
+            agent_type=context.agent_type
         )
+        logger.info(f"Request timings for {wallet}: {context.timings}")
         
         # Complete
         yield f"data: {json.dumps({'type': 'DONE', 'content': ''})}\n\n"
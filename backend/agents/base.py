@@ -4,9 +4,12 @@ Base Agent class for all LifeOS agents
 
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
+import asyncio
 import os
-from transformers import pipeline
-from huggingface_hub import login
+from utils.batching import get_batch_scheduler
+from utils.inference import generate_text, get_inference_executor
+from utils.reasoning_cache import get_reasoning_cache
+from utils.services import ServiceContainer, get_services
 
 # OML Fingerprint for agent identification
 OML_FINGERPRINT = "dailyagi_v1_0x1234567890abcdef"
@@ -15,41 +18,92 @@ OML_FINGERPRINT = "dailyagi_v1_0x1234567890abcdef"
 class BaseAgent(ABC):
     """Base class for all DAILYAGI agents"""
     
-    def __init__(self, name: str):
+    def __init__(self, name: str, services: Optional[ServiceContainer] = None):
         self.name = name
+        # Shared clients (IPFS, Twilio, Calendar, ...) come from the container
+        self.services = services or get_services()
+        # Hugging Face login happens once per process when the model registry
+        # first loads a model, not per agent
         self.hf_token = os.getenv("HF_TOKEN")
-        if self.hf_token:
-            try:
-                login(token=self.hf_token)
-            except:
-                pass  # Already logged in or token invalid
+    
+    @property
+    def ipfs(self):
+        return self.services.ipfs
     
     @abstractmethod
     async def run(self, address: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Main agent execution method"""
         pass
     
-    def get_dobby_reasoning(self, prompt: str, max_length: int = 200) -> str:
+    def get_dobby_reasoning(
+        self,
+        prompt: str,
+        max_length: Optional[int] = None,
+        use_cache: bool = True
+    ) -> str:
         """
         Use Dobby (Hugging Face) for reasoning tasks
         Mock implementation using transformers
+        
+        Blocks the calling thread; async code should use get_dobby_reasoning_async
         """
+        cache = get_reasoning_cache()
+        key = cache.key_for(prompt, max_length) if use_cache else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
         try:
             # In production, this would use Sentient's Dobby API
-            # For now, we'll use a simple text generation model
-            generator = pipeline(
-                "text-generation",
-                model="gpt2",  # Placeholder - replace with Dobby model
-                tokenizer="gpt2",
-                max_length=max_length,
-                do_sample=True,
-                temperature=0.7
-            )
-            result = generator(prompt, max_length=max_length)[0]
-            return result.get("generated_text", prompt)
+            # For now, we use the shared text generation model from the registry
+            text = generate_text(prompt, max_length)
+        except Exception as e:
+            print(f"Dobby reasoning error: {e}")
+            return f"[Dobby Reasoning] {prompt}"
+        
+        if key is not None:
+            cache.set(key, text)
+        return text
+    
+    async def get_dobby_reasoning_async(
+        self,
+        prompt: str,
+        max_length: Optional[int] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = True
+    ) -> str:
+        """
+        Run Dobby reasoning on the inference executor without blocking the event loop
+        Concurrent prompts are micro-batched when DOBBY_BATCH_SIZE > 1
+        Falls back to the mock reasoning text on timeout, overload or model errors
+        """
+        cache = get_reasoning_cache()
+        key = cache.key_for(prompt, max_length) if use_cache else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
+        try:
+            scheduler = get_batch_scheduler()
+            if scheduler.enabled:
+                text = await scheduler.generate(prompt, max_length, timeout=timeout)
+            else:
+                text = await get_inference_executor().submit(
+                    generate_text, prompt, max_length, timeout=timeout
+                )
+        except asyncio.TimeoutError:
+            print("Dobby reasoning error: generation timed out")
+            return f"[Dobby Reasoning] {prompt}"
         except Exception as e:
             print(f"Dobby reasoning error: {e}")
             return f"[Dobby Reasoning] {prompt}"
+        
+        # Fallback text is never cached, only real generations
+        if key is not None:
+            cache.set(key, text)
+        return text
     
     def get_oml_fingerprint(self) -> str:
         """Return OML fingerprint for this agent"""
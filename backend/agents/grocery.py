@@ -3,24 +3,41 @@ Grocery Agent - Uses vision AI to detect missing items and create shopping lists
 """
 
 import os
+import json
 import uuid
-from typing import Dict, Any, List
+import asyncio
+import hashlib
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from agents.base import BaseAgent
-from utils.ipfs import IPFSStorage
-from utils.exa_vision import ExaVisionClient
+from utils.grocery_catalog import get_grocery_catalog
+from utils.perceptual_cache import dhash
+from utils.services import ServiceContainer
 
 # OML Fingerprint
 OML_FINGERPRINT = "dailyagi_grocery_v1_0x4567890abcdef123"
 
+# How long an in-flight list upload holds its reservation before others take over
+LIST_RESERVATION_SECONDS = 30
+
 
 class GroceryAgent(BaseAgent):
     """Agent for processing fridge images and generating grocery lists"""
     
-    def __init__(self):
-        super().__init__("GroceryAgent")
-        self.ipfs = IPFSStorage()
-        self.exa = ExaVisionClient()
+    def __init__(self, services: Optional[ServiceContainer] = None):
+        super().__init__("GroceryAgent", services)
+    
+    @property
+    def exa(self):
+        return self.services.exa
+    
+    @property
+    def image_cache(self):
+        return self.services.image_cache
+    
+    @property
+    def pantry_store(self):
+        return self.services.pantry_store
     
     async def run(self, address: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -33,10 +50,12 @@ class GroceryAgent(BaseAgent):
                 image_data=params["image_data"],
                 filename=params.get("filename", "fridge.jpg")
             )
+        elif "purchased" in params:
+            return await self.record_purchases(address, params["purchased"])
         elif "cid" in params:
             return await self.get_list_from_ipfs(params["cid"])
         else:
-            return {"error": "Missing image_data or cid parameter"}
+            return {"error": "Missing image_data, purchased or cid parameter"}
     
     async def process_image(
         self,
@@ -45,21 +64,46 @@ class GroceryAgent(BaseAgent):
         filename: str
     ) -> Dict[str, Any]:
         """Process fridge image and generate grocery list"""
-        # Use Exa Vision API to detect items
-        detected_items = await self.exa.detect_items(image_data)
+        # Near-duplicate photos from the same wallet reuse the earlier analysis
+        try:
+            image_hash = await asyncio.to_thread(dhash, image_data)
+        except Exception as e:
+            print(f"Image hash failed: {e}")
+            image_hash = None
+        cached = self.image_cache.get(address, image_hash) if image_hash is not None else None
         
-        # Use Dobby reasoning to generate shopping list
-        reasoning_prompt = f"""
-        Based on the detected items in the fridge: {detected_items}
-        Generate a shopping list of missing essential items.
-        Consider: milk, eggs, bread, vegetables, fruits, meat, etc.
-        Format as JSON with name, quantity, and category for each item.
-        """
+        degraded = False
+        if cached is not None:
+            detected_items = cached["detected_items"]
+            shopping_list_text = cached["shopping_list_text"]
+        else:
+            # Use Exa Vision API to detect items; degraded means mock items
+            detected_items, degraded = await self.exa.detect_items(image_data)
+            
+            # Use Dobby reasoning to generate shopping list
+            reasoning_prompt = f"""
+            Based on the detected items in the fridge: {detected_items}
+            Generate a shopping list of missing essential items.
+            Consider: milk, eggs, bread, vegetables, fruits, meat, etc.
+            Format as JSON with name, quantity, and category for each item.
+            """
+            
+            shopping_list_text = await self.get_dobby_reasoning_async(reasoning_prompt)
+            
+            if image_hash is not None and not degraded:
+                self.image_cache.set(address, image_hash, {
+                    "detected_items": detected_items,
+                    "shopping_list_text": shopping_list_text
+                })
         
-        shopping_list_text = self.get_dobby_reasoning(reasoning_prompt)
+        # Diff against the wallet's pantry; near-duplicate photos and mock
+        # detections (Exa unavailable) change nothing
+        pantry = await asyncio.to_thread(
+            self.update_pantry, address, detected_items, cached is None and not degraded
+        )
         
         # Parse shopping list (in production, Dobby would return structured JSON)
-        items = self.parse_shopping_list(shopping_list_text, detected_items)
+        items = self.parse_shopping_list(shopping_list_text, detected_items, pantry["counts"])
         
         # Create grocery list object
         grocery_list = {
@@ -71,42 +115,120 @@ class GroceryAgent(BaseAgent):
             "filename": filename
         }
         
-        # Store on IPFS
-        try:
-            cid = await self.ipfs.store_json(grocery_list)
-            grocery_list["cid"] = cid
-        except Exception as e:
-            print(f"IPFS storage failed: {e}")
-            grocery_list["cid"] = None
+        # Store on IPFS, unless the list and pantry match the last stored list
+        fingerprint = self.list_fingerprint(items, pantry["present"])
+        grocery_list["cid"] = await self._store_list(address, fingerprint, grocery_list)
         
         return {
             "items": items,
             "cid": grocery_list.get("cid"),
-            "timestamp": grocery_list["timestamp"]
+            "timestamp": grocery_list["timestamp"],
+            "cached": cached is not None,
+            "degraded": degraded,
+            "changes": pantry["changes"]
         }
     
-    def parse_shopping_list(self, reasoning_text: str, detected_items: List[str]) -> List[Dict[str, str]]:
+    def update_pantry(self, address: str, detected_items: List[str], record: bool = True) -> Dict[str, Any]:
         """
-        Parse Dobby reasoning output into structured shopping list
-        In production, Dobby would return JSON directly
+        Apply a detection to the wallet's pantry.
+        Returns the changes (added, removed, running_low), the names of the
+        items present, and the wallet's purchase counts.
         """
-        # Mock parsing - in production, use structured output from Dobby
-        essential_items = [
-            {"name": "Milk", "quantity": "1 gallon", "category": "Dairy"},
-            {"name": "Eggs", "quantity": "1 dozen", "category": "Dairy"},
-            {"name": "Bread", "quantity": "1 loaf", "category": "Bakery"},
-            {"name": "Bananas", "quantity": "1 bunch", "category": "Fruits"},
-            {"name": "Chicken Breast", "quantity": "1 lb", "category": "Meat"},
-            {"name": "Lettuce", "quantity": "1 head", "category": "Vegetables"},
-        ]
+        catalog = get_grocery_catalog()
+        quantities = {
+            catalog.items[index]["name"]: quantity
+            for index, quantity in catalog.quantities(detected_items).items()
+        }
+        changes = {"added": [], "removed": [], "running_low": []}
+        counts = {}
+        try:
+            if record:
+                changes = self.pantry_store.apply_detection(address, quantities)
+            counts = self.pantry_store.purchase_counts(address)
+        except Exception as e:
+            print(f"Pantry store error: {e}")
         
-        # Filter out items that were detected
-        missing_items = [
-            item for item in essential_items
-            if not any(detected.lower() in item["name"].lower() for detected in detected_items)
-        ]
+        for change in changes.values():
+            for item in change:
+                index = catalog.index_of(item["name"])
+                if index is not None:
+                    item["category"] = catalog.items[index]["category"]
+        return {"changes": changes, "present": sorted(quantities), "counts": counts}
+    
+    async def record_purchases(self, address: str, items: List[str]) -> Dict[str, Any]:
+        """
+        Record items checked off a shopping list as bought; purchase counts
+        rank the wallet's future lists. Labels are resolved through the catalog.
+        """
+        catalog = get_grocery_catalog()
+        names = sorted({catalog.items[index]["name"] for index in catalog.present(items)})
+        await asyncio.to_thread(self.pantry_store.record_purchases, address, names)
+        return {"recorded": names}
+    
+    async def _store_list(self, address: str, fingerprint: str, grocery_list: Dict[str, Any]) -> Optional[str]:
+        """
+        Store a grocery list on IPFS unless the same list is already stored for
+        this wallet; concurrent uploads of one list store it once
+        """
+        reserved = False
+        while True:
+            try:
+                status, cid = await asyncio.to_thread(
+                    self.pantry_store.reserve_list, address, fingerprint, LIST_RESERVATION_SECONDS
+                )
+            except Exception as e:
+                # Without the store there is no dedupe; storing again is harmless
+                print(f"Pantry store error: {e}")
+                break
+            if status == "stored":
+                return cid
+            if status == "reserved":
+                reserved = True
+                break
+            await asyncio.sleep(0.1)
         
-        return missing_items[:10]  # Return top 10 items
+        try:
+            cid = await self.ipfs.store_json(grocery_list)
+        except Exception as e:
+            print(f"IPFS storage failed: {e}")
+            if reserved:
+                await asyncio.to_thread(self.pantry_store.release_list, address, fingerprint)
+            return None
+        if reserved:
+            try:
+                await asyncio.to_thread(self.pantry_store.set_last_list, address, fingerprint, cid)
+            except Exception as e:
+                print(f"Pantry store error: {e}")
+        return cid
+    
+    @staticmethod
+    def list_fingerprint(items: List[Dict[str, str]], present: List[str]) -> str:
+        """Digest of a shopping list and the pantry it was made from (ignores timestamps and raw labels)"""
+        payload = json.dumps({"items": items, "present": present}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get_pantry(self, address: str) -> List[Dict[str, Any]]:
+        """Items currently in the wallet's pantry, for clients applying incremental changes"""
+        catalog = get_grocery_catalog()
+        items = self.pantry_store.items(address)
+        for item in items:
+            index = catalog.index_of(item["name"])
+            item["category"] = catalog.items[index]["category"] if index is not None else "Other"
+        return items
+    
+    def parse_shopping_list(
+        self,
+        reasoning_text: str,
+        detected_items: List[str],
+        household_counts: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Parse Dobby reasoning output into structured shopping list
+        In production, Dobby would return JSON directly
+        """
+        # Mock parsing - in production, use structured output from Dobby.
+        # Essentials plus the wallet's usual items, minus what was detected
+        return get_grocery_catalog().missing(detected_items, household_counts)
     
     async def get_list_from_ipfs(self, cid: str) -> Dict[str, Any]:
         """Retrieve grocery list from IPFS"""
@@ -4,17 +4,43 @@ Routes user intents to appropriate sub-agents and coordinates multi-agent workfl
 """
 
 import re
+import time
+from dataclasses import dataclass, field
 from typing import Dict, Any, AsyncGenerator, Optional
 from agents.base import BaseAgent
 from agents.reminders import RemindersAgent
 from agents.spending import SpendingAgent
 from agents.grocery import GroceryAgent
-from utils.enclave import MockEnclave
+from utils.services import ServiceContainer, get_services
 
 # OML Fingerprint for MetaAgent
 OML_FINGERPRINT = "dailyagi_meta_v1_0x1234567890abcdef"
 
 
+@dataclass
+class RunContext:
+    """
+    State for a single Sentient Chat request.
+    
+    Carries the detected intent, extracted params, agent result, step
+    timings and usage cost through the whole stream, so concurrent
+    requests never share state on the agent.
+    """
+    message: str
+    wallet: str
+    intent: Optional[Dict[str, Any]] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    cost: float = 0.0
+    
+    @property
+    def agent_type(self) -> str:
+        if self.intent is None:
+            return "unknown"
+        return self.intent.get("agent_type", "unknown")
+
+
 class LifeOSAgent:
     """
     MetaAgent that orchestrates all dailyAGI sub-agents using ROMA runtime.
@@ -26,14 +52,20 @@ class LifeOSAgent:
     - Tracks progress for streaming responses
     """
     
-    def __init__(self):
-        self.reminders_agent = RemindersAgent()
-        self.spending_agent = SpendingAgent()
-        self.grocery_agent = GroceryAgent()
-        self.enclave = MockEnclave()
-        self._last_result = None  # Store last result to avoid re-running
-        self._last_intent = None
-        self._last_params = None
+    def __init__(
+        self,
+        services: Optional[ServiceContainer] = None,
+        reminders_agent: Optional[RemindersAgent] = None,
+        spending_agent: Optional[SpendingAgent] = None,
+        grocery_agent: Optional[GroceryAgent] = None
+    ):
+        # Reuse existing sub-agents when given, otherwise build them on the
+        # shared container so no client is created twice
+        self.services = services or get_services()
+        self.reminders_agent = reminders_agent or RemindersAgent(self.services)
+        self.spending_agent = spending_agent or SpendingAgent(self.services)
+        self.grocery_agent = grocery_agent or GroceryAgent(self.services)
+        self.enclave = self.services.enclave
         
         # Intent detection patterns
         self.reminder_keywords = [
@@ -49,7 +81,7 @@ class LifeOSAgent:
             "food", "items", "list", "buy", "need", "missing"
         ]
     
-    def detect_intent(self, message: str) -> Dict[str, Any]:
+    async def detect_intent(self, message: str) -> Dict[str, Any]:
         """
         Detect user intent using keyword matching and Dobby reasoning.
         
@@ -73,7 +105,7 @@ class LifeOSAgent:
         if reminder_score == spending_score == grocery_score == 0:
             # No clear intent, use Dobby to reason
             reasoning_prompt = f"Determine the intent of this message: {message}"
-            reasoning = self.reminders_agent.get_dobby_reasoning(reasoning_prompt)
+            reasoning = await self.reminders_agent.get_dobby_reasoning_async(reasoning_prompt)
             
             # Fallback to reminders if unclear
             return {
@@ -147,104 +179,113 @@ class LifeOSAgent:
         
         return params
     
+    async def _route(self, agent_type: str, wallet: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the sub-agent for agent_type with the extracted params"""
+        if agent_type == "reminders":
+            return await self.reminders_agent.run(wallet, {
+                "action": "create",
+                **params
+            })
+        elif agent_type == "spending":
+            return await self.spending_agent.run(wallet, {
+                "timeRange": params.get("timeRange", "30d")
+            })
+        elif agent_type == "grocery":
+            return await self.grocery_agent.run(wallet, params)
+        return {"error": "Unknown agent type"}
+    
     async def run_with_progress(
         self,
         message: str,
-        wallet: str
+        wallet: str,
+        context: Optional[RunContext] = None
     ) -> AsyncGenerator[str, None]:
         """
         Run agent with progress tracking for streaming responses.
         
         This method yields progress updates that can be streamed to Sentient Chat.
-        Stores results for use in handle_task() to avoid re-running agents.
+        Intent, params and result are stored on the per-request context so
+        handle_task() can format the answer without re-running anything.
         
         Args:
             message: User's natural language message
             wallet: User's wallet address
+            context: Run context for this request (created if not given)
         
         Yields:
             str: Progress update messages
         """
+        if context is None:
+            context = RunContext(message=message, wallet=wallet)
+        
         # Step 1: Detect intent
         yield "Analyzing your request..."
-        intent = self.detect_intent(message)
+        started = time.perf_counter()
+        intent = await self.detect_intent(message)
+        context.intent = intent
+        context.timings["intent"] = time.perf_counter() - started
         agent_type = intent["agent_type"]
-        self._last_intent = intent
         
         yield f"Detected intent: {agent_type} (confidence: {intent['confidence']:.0%})"
         
         # Step 2: Extract parameters
         yield "Extracting parameters..."
+        started = time.perf_counter()
         params = self.extract_params(message, agent_type)
-        self._last_params = params
+        context.params = params
+        context.timings["params"] = time.perf_counter() - started
         
         # Step 3: Route to appropriate agent
         if agent_type == "reminders":
             yield "Routing to Reminders Agent..."
             yield "Processing reminder request..."
-            result = await self.reminders_agent.run(wallet, {
-                "action": "create",
-                **params
-            })
         elif agent_type == "spending":
             yield "Routing to Spending Agent..."
             yield "Fetching on-chain transactions..."
             yield "Analyzing spending patterns..."
-            result = await self.spending_agent.run(wallet, {
-                "timeRange": params.get("timeRange", "30d")
-            })
         elif agent_type == "grocery":
             yield "Routing to Grocery Agent..."
             yield "Processing grocery request..."
-            result = await self.grocery_agent.run(wallet, params)
         else:
             yield "Unknown agent type, using default..."
-            result = {"error": "Unknown agent type"}
         
-        # Store result for handle_task
-        self._last_result = result
+        started = time.perf_counter()
+        context.result = await self._route(agent_type, wallet, params)
+        context.timings["agent"] = time.perf_counter() - started
         yield "Finalizing response..."
     
     async def handle_task(
         self,
         message: str,
-        wallet: str
+        wallet: str,
+        context: Optional[RunContext] = None
     ) -> str:
         """
         Handle the complete task and return final answer.
         
         This method is called after run_with_progress() to get the final result.
-        Uses cached results from run_with_progress() to avoid re-running agents.
+        Uses the result stored on the context to avoid re-running agents.
         
         Args:
             message: User's natural language message
             wallet: User's wallet address
+            context: Run context filled in by run_with_progress()
         
         Returns:
             str: Final answer to send to user
         """
-        # Use cached results if available (from run_with_progress)
-        if self._last_result is not None and self._last_intent is not None:
-            intent = self._last_intent
-            result = self._last_result
-        else:
+        if context is None:
+            context = RunContext(message=message, wallet=wallet)
+        
+        if context.result is None:
             # Fallback: detect and run if not called via run_with_progress
-            intent = self.detect_intent(message)
-            params = self.extract_params(message, intent["agent_type"])
-            
-            if intent["agent_type"] == "reminders":
-                result = await self.reminders_agent.run(wallet, {
-                    "action": "create",
-                    **params
-                })
-            elif intent["agent_type"] == "spending":
-                result = await self.spending_agent.run(wallet, {
-                    "timeRange": params.get("timeRange", "30d")
-                })
-            elif intent["agent_type"] == "grocery":
-                result = await self.grocery_agent.run(wallet, params)
-            else:
-                return "I'm not sure how to help with that. Try asking about reminders, spending, or groceries!"
+            if context.intent is None:
+                context.intent = await self.detect_intent(message)
+            context.params = self.extract_params(message, context.intent["agent_type"])
+            context.result = await self._route(context.intent["agent_type"], wallet, context.params)
+        
+        intent = context.intent
+        result = context.result
         
         agent_type = intent["agent_type"]
         
@@ -4,12 +4,12 @@ Reminders Agent - Handles calendar-based reminders and SMS notifications
 
 import os
 import uuid
+import asyncio
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Awaitable
 from agents.base import BaseAgent
-from utils.ipfs import IPFSStorage
-from utils.twilio_client import TwilioClient
-from utils.google_calendar import GoogleCalendarClient
+from utils.reminder_store import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_due_time
+from utils.services import ServiceContainer
 
 # OML Fingerprint
 OML_FINGERPRINT = "dailyagi_reminders_v1_0xabcdef1234567890"
@@ -18,12 +18,25 @@ OML_FINGERPRINT = "dailyagi_reminders_v1_0xabcdef1234567890"
 class RemindersAgent(BaseAgent):
     """Agent for managing reminders with Google Calendar and Twilio SMS"""
     
-    def __init__(self):
-        super().__init__("RemindersAgent")
-        self.ipfs = IPFSStorage()
-        self.twilio = TwilioClient()
-        self.calendar = GoogleCalendarClient()
-        self.reminders_store: Dict[str, List[Dict[str, Any]]] = {}
+    def __init__(self, services: Optional[ServiceContainer] = None):
+        super().__init__("RemindersAgent", services)
+        self.side_effect_timeout = float(os.getenv("REMINDER_SIDE_EFFECT_TIMEOUT", "5"))
+    
+    @property
+    def reminders_store(self):
+        return self.services.reminder_store
+    
+    @property
+    def twilio(self):
+        return self.services.twilio
+    
+    @property
+    def calendar(self):
+        return self.services.calendar
+    
+    @property
+    def outbox(self):
+        return self.services.outbox
     
     async def run(self, address: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -40,7 +53,7 @@ class RemindersAgent(BaseAgent):
         Determine the best course of action for this reminder.
         """
         
-        reasoning = self.get_dobby_reasoning(reasoning_prompt)
+        reasoning = await self.get_dobby_reasoning_async(reasoning_prompt)
         
         if action == "create":
             return await self.create_reminder(
@@ -53,6 +66,8 @@ class RemindersAgent(BaseAgent):
             return await self.get_reminders(address)
         elif action == "delete":
             return await self.delete_reminder(address, params.get("id", ""))
+        elif action == "complete":
+            return await self.complete_reminder(address, params.get("id", ""))
         else:
             return {"error": "Unknown action", "reasoning": reasoning}
     
@@ -75,50 +90,117 @@ class RemindersAgent(BaseAgent):
             "address": address
         }
         
-        # Store on IPFS
-        try:
-            cid = await self.ipfs.store_json(reminder)
-            reminder["cid"] = cid
-        except Exception as e:
-            print(f"IPFS storage failed: {e}")
-            reminder["cid"] = None
-        
-        # Add to local store
-        if address not in self.reminders_store:
-            self.reminders_store[address] = []
-        self.reminders_store[address].append(reminder)
+        # The reminder is durable once it is in the store; everything else is best effort
+        reminder["cid"] = None
+        await asyncio.to_thread(self.reminders_store.create, reminder)
+        self.services.reminder_scheduler.notify(parse_due_time(datetime_str))
         
-        # Sync with Google Calendar (if configured)
-        try:
-            await self.calendar.create_event(
-                title=title,
-                description=description,
-                start_time=datetime_str
-            )
-        except Exception as e:
-            print(f"Calendar sync failed: {e}")
+        # The SMS goes out when the reminder comes due (see the scheduler's dispatch)
+        ipfs_outcome, calendar_outcome = await asyncio.gather(
+            self._side_effect("IPFS storage", self._store_on_ipfs(reminder)),
+            self._side_effect("Calendar sync", self._enqueue_delivery("calendar", address, {
+                "op": "insert",
+                "reminder_id": reminder_id,
+                "title": title,
+                "description": description,
+                "start_time": datetime_str
+            }))
+        )
+        reminder["side_effects"] = {
+            "ipfs": ipfs_outcome,
+            "calendar": calendar_outcome
+        }
         
-        # Send SMS notification (if configured)
+        return reminder
+    
+    async def _store_on_ipfs(self, reminder: Dict[str, Any]) -> Dict[str, Any]:
+        """Store the reminder document on IPFS and record its CID"""
+        document = {key: value for key, value in reminder.items() if key != "cid"}
+        cid = await self.ipfs.store_json(document)
+        reminder["cid"] = cid
+        await asyncio.to_thread(self.reminders_store.set_cid, reminder["id"], cid)
+        return {"cid": cid}
+    
+    async def _enqueue_delivery(self, provider: str, recipient: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a Calendar or SMS delivery in the outbox; workers send it later"""
+        delivery_id = await asyncio.to_thread(self.outbox.enqueue, provider, recipient, payload)
+        return {"status": "queued", "delivery_id": delivery_id}
+    
+    async def _side_effect(self, name: str, operation: Awaitable[Any]) -> Dict[str, Any]:
+        """Run one side effect under its own timeout; failures are reported, never raised"""
         try:
-            await self.twilio.send_reminder_sms(
-                to=address,  # In production, use user's phone number
-                message=f"Reminder: {title} at {datetime_str}"
-            )
+            result = await asyncio.wait_for(operation, timeout=self.side_effect_timeout)
+        except asyncio.TimeoutError:
+            print(f"{name} timed out after {self.side_effect_timeout}s")
+            return {"status": "timeout"}
         except Exception as e:
-            print(f"SMS notification failed: {e}")
+            print(f"{name} failed: {e}")
+            return {"status": "failed", "error": str(e)}
         
-        return reminder
+        if result is False:
+            return {"status": "failed"}
+        outcome = {"status": "ok"}
+        if isinstance(result, dict):
+            outcome.update(result)
+        return outcome
     
     async def get_reminders(self, address: str) -> List[Dict[str, Any]]:
-        """Get all reminders for an address"""
-        return self.reminders_store.get(address, [])
+        """Get all reminders for an address, reading the store page by page"""
+        reminders, cursor = await asyncio.to_thread(self.reminders_store.list, address, MAX_PAGE_SIZE)
+        while cursor is not None:
+            page, cursor = await asyncio.to_thread(self.reminders_store.list, address, MAX_PAGE_SIZE, cursor)
+            reminders.extend(page)
+        return reminders
+    
+    async def list_reminders(
+        self,
+        address: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get one page of reminders for an address"""
+        reminders, next_cursor = await asyncio.to_thread(self.reminders_store.list, address, limit, cursor)
+        return {"reminders": reminders, "next_cursor": next_cursor}
     
     async def delete_reminder(self, address: str, reminder_id: str) -> Dict[str, Any]:
         """Delete a reminder"""
-        if address in self.reminders_store:
-            self.reminders_store[address] = [
-                r for r in self.reminders_store[address]
-                if r["id"] != reminder_id
-            ]
-        return {"success": True, "id": reminder_id}
+        deleted = await asyncio.to_thread(self.reminders_store.delete, address, reminder_id)
+        if deleted:
+            await self._enqueue_delivery("calendar", address, {"op": "delete", "reminder_id": reminder_id})
+        return {"success": deleted, "id": reminder_id}
+    
+    async def complete_reminder(self, address: str, reminder_id: str) -> Dict[str, Any]:
+        """Mark a reminder as completed"""
+        reminder = await asyncio.to_thread(self.reminders_store.complete, address, reminder_id)
+        if reminder is None:
+            return {"success": False, "id": reminder_id}
+        await self._enqueue_delivery("calendar", address, {
+            "op": "update",
+            "reminder_id": reminder_id,
+            "title": reminder["title"],
+            "description": reminder["description"],
+            "start_time": reminder["datetime"],
+            "completed": True
+        })
+        return {"success": True, "id": reminder_id, "reminder": reminder}
+    
+    async def sync_from_calendar(self) -> Dict[str, Any]:
+        """Apply events edited or deleted in Google Calendar back to the reminders store"""
+        changes = await asyncio.to_thread(self.services.calendar_sync.pull_changes)
+        updated = deleted = 0
+        for change in changes:
+            reminder = await asyncio.to_thread(self.reminders_store.get, change["reminder_id"])
+            if reminder is None:
+                continue
+            if change["status"] == "cancelled":
+                deleted += await asyncio.to_thread(self.reminders_store.delete, reminder["address"], reminder["id"])
+                continue
+            start_time = change.get("start_time") or reminder["datetime"]
+            updated_one = await asyncio.to_thread(
+                self.reminders_store.update, reminder["id"], change["title"], change["description"], start_time
+            )
+            if updated_one:
+                self.services.reminder_scheduler.notify(parse_due_time(start_time))
+                updated += 1
+        return {"updated": updated, "deleted": deleted}
 
@@ -3,23 +3,47 @@ Spending Agent - Analyzes on-chain transactions and provides spending insights
 """
 
 import os
-from typing import Dict, Any, List
+import time
+import asyncio
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 from agents.base import BaseAgent
-from utils.covalent import CovalentClient
-from utils.ipfs import IPFSStorage
+from utils.address_labels import get_address_label_index
+from utils.classifier import get_transaction_classifier
+from utils.covalent import parse_timestamp, to_epoch
+from utils.services import ServiceContainer
+from utils.spending_aggregation import (
+    RunningTotals,
+    aggregate_spending,
+    daily_chart,
+    transaction_dates,
+    transaction_values,
+)
 
 # OML Fingerprint
 OML_FINGERPRINT = "dailyagi_spending_v1_0x7890abcdef123456"
 
 
+def analysis_window(time_range: str) -> Tuple[int, datetime, datetime]:
+    """Days, start and end of the window for a time range ("7d", "30d" or "90d")"""
+    days = {"7d": 7, "30d": 30, "90d": 90}.get(time_range, 30)
+    end_date = datetime.now()
+    return days, end_date - timedelta(days=days), end_date
+
+
 class SpendingAgent(BaseAgent):
     """Agent for analyzing spending patterns from on-chain transactions"""
     
-    def __init__(self):
-        super().__init__("SpendingAgent")
-        self.covalent = CovalentClient()
-        self.ipfs = IPFSStorage()
+    def __init__(self, services: Optional[ServiceContainer] = None):
+        super().__init__("SpendingAgent", services)
+    
+    @property
+    def covalent(self):
+        return self.services.covalent
+    
+    @property
+    def tx_store(self):
+        return self.services.tx_store
     
     async def run(self, address: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -32,45 +56,60 @@ class SpendingAgent(BaseAgent):
     async def analyze(self, address: str, time_range: str = "30d") -> Dict[str, Any]:
         """Analyze spending for an address"""
         # Calculate date range
-        days = {"7d": 7, "30d": 30, "90d": 90}.get(time_range, 30)
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        days, start_date, end_date = analysis_window(time_range)
         
-        # Fetch transactions from Covalent
-        transactions = await self.covalent.get_transactions(
-            address=address,
-            start_date=start_date,
-            end_date=end_date
-        )
+        # Fetch transactions, syncing only new blocks into the local store
+        transactions = await self.get_transactions(address, start_date, end_date)
+        return await self.summarize(address, time_range, days, transactions)
+    
+    async def analyze_stream(self, address: str, time_range: str = "30d") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze spending for an address, yielding partial results as data arrives
         
-        # Classify transactions using Dobby
-        classified_txs = []
-        categories = {}
-        total_spent = 0.0
+        Yields "progress" events with running category totals and chart points
+        (first from the local store, then after each newly fetched page), and
+        finally a "summary" event with the same payload as analyze()
+        """
+        days, start_date, end_date = analysis_window(time_range)
         
-        for tx in transactions:
-            # Use Dobby for classification
-            classification_prompt = f"""
-            Classify this transaction: {tx.get('description', '')} 
-            Amount: ${tx.get('value', 0)}
-            Determine category: coffee, food, bills, shopping, entertainment, other
-            """
+        if not self.covalent.api_key:
+            transactions = await self.covalent.get_transactions(address, start_date, end_date)
+        else:
+            running = RunningTotals()
             
-            category = self.classify_transaction(classification_prompt, tx)
-            value = float(tx.get("value", 0))
+            # Whatever is already synced locally can be shown immediately
+            cached = await asyncio.to_thread(self.tx_store.query, address, start_date, end_date)
+            if cached:
+                running.add(cached, self.classify_transactions(cached))
+                yield running.event(chainId=None, source="cache")
             
-            classified_tx = {
-                **tx,
-                "category": category,
-                "value": value
-            }
-            classified_txs.append(classified_tx)
+            start_ts = to_epoch(start_date)
+            async for chain_id, page in self._sync_pages(address):
+                in_window = [
+                    tx for tx in page
+                    if (parse_timestamp(tx.get("timestamp", "")) or 0) >= start_ts
+                ]
+                if in_window and running.add(in_window, self.classify_transactions(in_window)):
+                    yield running.event(chainId=chain_id, source="covalent")
             
-            # Aggregate by category
-            if category not in categories:
-                categories[category] = 0.0
-            categories[category] += value
-            total_spent += value
+            transactions = await asyncio.to_thread(self.tx_store.query, address, start_date, end_date)
+        
+        result = await self.summarize(address, time_range, days, transactions)
+        yield {"type": "summary", **result}
+    
+    async def summarize(
+        self,
+        address: str,
+        time_range: str,
+        days: int,
+        transactions: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Classify, aggregate, nudge and store an analysis of the given transactions"""
+        # Classify transactions, then aggregate them in one columnar pass
+        categories = self.classify_transactions(transactions)
+        summary = aggregate_spending(transactions, categories)
+        classified_txs = summary.transactions
+        total_spent = summary.total_spent
         
         # Generate spending nudge if needed
         nudge = None
@@ -79,17 +118,16 @@ class SpendingAgent(BaseAgent):
             User has spent ${total_spent} in the last {days} days.
             Generate a friendly spending nudge message.
             """
-            nudge = self.get_dobby_reasoning(nudge_prompt)
+            nudge = await self.get_dobby_reasoning_async(nudge_prompt)
         
-        # Prepare chart data
-        chart_data = self.prepare_chart_data(classified_txs, days)
+        chart_data = summary.chart_data
         
         # Store analysis on IPFS
         analysis = {
             "address": address,
             "time_range": time_range,
             "total_spent": total_spent,
-            "categories": categories,
+            "categories": summary.categories,
             "transactions": classified_txs,
             "timestamp": datetime.now().isoformat()
         }
@@ -103,53 +141,158 @@ class SpendingAgent(BaseAgent):
         return {
             "transactions": classified_txs,
             "totalSpent": total_spent,
-            "categories": categories,
+            "categories": summary.categories,
             "chartData": chart_data,
             "nudge": nudge,
             "cid": analysis.get("cid")
         }
     
-    def classify_transaction(self, prompt: str, tx: Dict[str, Any]) -> str:
+    async def get_transactions(
+        self,
+        address: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[Dict[str, Any]]:
+        """Sync new transactions into the local store, then read the window from it"""
+        if not self.covalent.api_key:
+            # Mock transactions are not worth persisting
+            return await self.covalent.get_transactions(address, start_date, end_date)
+        
+        await self.sync_transactions(address)
+        return await asyncio.to_thread(self.tx_store.query, address, start_date, end_date)
+    
+    async def sync_transactions(self, address: str) -> int:
+        """
+        Fetch transactions newer than each chain's last synced block
+        Returns the number of transactions fetched
+        """
+        fetched = 0
+        async for _, page in self._sync_pages(address):
+            fetched += len(page)
+        return fetched
+    
+    async def _sync_pages(self, address: str) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Sync new transactions into the local store, yielding each stored page
+        The first sync for a wallet backfills TX_SYNC_HORIZON_DAYS of history.
+        A sync cut short by COVALENT_MAX_PAGES still moves the checkpoint to the
+        newest block and leaves a resume cursor; later syncs continue the
+        backfill from there, max_pages at a time.
+        """
+        checkpoints = await asyncio.to_thread(self.tx_store.checkpoints, address)
+        min_interval = float(os.getenv("TX_SYNC_INTERVAL", "15"))
+        chains = [
+            chain_id for chain_id in self.covalent.chains
+            if chain_id not in checkpoints
+            or time.time() - checkpoints[chain_id]["synced_at"] >= min_interval
+        ]
+        if not chains:
+            return
+        
+        start_date = datetime.now() - timedelta(days=int(os.getenv("TX_SYNC_HORIZON_DAYS", "90")))
+        after_blocks = {
+            chain_id: checkpoints[chain_id]["last_block"]
+            for chain_id in chains
+            if chain_id in checkpoints and checkpoints[chain_id]["last_block"]
+        }
+        backfills = {
+            chain_id: checkpoints[chain_id]
+            for chain_id in chains
+            if chain_id in checkpoints and checkpoints[chain_id]["backfill_page"] is not None
+        }
+        newest_block: Dict[int, Optional[int]] = {}
+        completed = []
+        
+        # New blocks first
+        async for chain_id, page in self.covalent.iter_transactions(
+            address,
+            start_date=start_date,
+            end_date=None,
+            chains=chains,
+            after_blocks=after_blocks
+        ):
+            if page is None or page is False:
+                await asyncio.to_thread(self.tx_store.set_checkpoint, address, chain_id, newest_block.get(chain_id))
+                if page is None:
+                    completed.append(chain_id)
+                    continue
+                # Paging stopped short of the old checkpoint: resume the older
+                # blocks next time instead of paging from the top again
+                pending = backfills.get(chain_id)
+                await asyncio.to_thread(
+                    self.tx_store.set_backfill,
+                    address,
+                    chain_id,
+                    self.covalent.max_pages,
+                    pending["backfill_after"] if pending else after_blocks.get(chain_id)
+                )
+                continue
+            await asyncio.to_thread(self.tx_store.add_transactions, address, chain_id, page)
+            heights = [tx["block_height"] for tx in page if tx.get("block_height") is not None]
+            if heights:
+                newest_block[chain_id] = max(heights + [newest_block.get(chain_id) or 0])
+            yield chain_id, page
+        
+        # Then continue any unfinished backfill where the last one stopped
+        resume = [chain_id for chain_id in completed if chain_id in backfills]
+        if not resume:
+            return
+        async for chain_id, page in self.covalent.iter_transactions(
+            address,
+            start_date=start_date,
+            end_date=None,
+            chains=resume,
+            after_blocks={
+                chain_id: backfills[chain_id]["backfill_after"]
+                for chain_id in resume
+                if backfills[chain_id]["backfill_after"]
+            },
+            start_pages={chain_id: backfills[chain_id]["backfill_page"] for chain_id in resume}
+        ):
+            if page is None:
+                await asyncio.to_thread(self.tx_store.set_backfill, address, chain_id, None)
+                continue
+            if page is False:
+                backfill = backfills[chain_id]
+                await asyncio.to_thread(
+                    self.tx_store.set_backfill,
+                    address,
+                    chain_id,
+                    backfill["backfill_page"] + self.covalent.max_pages,
+                    backfill["backfill_after"]
+                )
+                continue
+            await asyncio.to_thread(self.tx_store.add_transactions, address, chain_id, page)
+            yield chain_id, page
+    
+    def classify_transaction(self, tx: Dict[str, Any]) -> str:
         """
         Classify transaction using Dobby text classification
         """
+        return self.classify_transactions([tx])[0]
+    
+    def classify_transactions(self, transactions: List[Dict[str, Any]]) -> List[str]:
+        """
+        Classify a batch of transactions in one call
+        Known counterparties are labelled from the address index; only the
+        unknown long tail falls through to keyword classification
+        """
         try:
-            # Simple keyword-based classification (replace with Dobby in production)
-            description = tx.get("description", "").lower()
-            value = float(tx.get("value", 0))
-            
-            if any(word in description for word in ["coffee", "cafe", "starbucks"]):
-                return "coffee"
-            elif any(word in description for word in ["food", "restaurant", "dining"]):
-                return "food"
-            elif any(word in description for word in ["bill", "utility", "rent"]):
-                return "bills"
-            elif any(word in description for word in ["shop", "store", "amazon"]):
-                return "shopping"
-            elif any(word in description for word in ["movie", "game", "entertainment"]):
-                return "entertainment"
-            else:
-                return "other"
+            labels = get_address_label_index()
+            categories = [labels.category(tx.get("to")) for tx in transactions]
+            unknown = [i for i, category in enumerate(categories) if category is None]
+            if unknown:
+                # Compiled keyword classifier (replace with Dobby in production)
+                keyword_categories = get_transaction_classifier().classify_many(
+                    transactions[i].get("description", "") for i in unknown
+                )
+                for i, category in zip(unknown, keyword_categories):
+                    categories[i] = category
+            return categories
         except Exception as e:
             print(f"Classification error: {e}")
-            return "other"
+            return ["other"] * len(transactions)
     
     def prepare_chart_data(self, transactions: List[Dict[str, Any]], days: int) -> List[Dict[str, str]]:
         """Prepare data for spending chart"""
-        # Group by date
-        daily_spending = {}
-        for tx in transactions:
-            date = tx.get("timestamp", datetime.now().isoformat())[:10]
-            if date not in daily_spending:
-                daily_spending[date] = 0.0
-            daily_spending[date] += float(tx.get("value", 0))
-        
-        # Convert to chart format
-        chart_data = [
-            {"date": date, "amount": amount}
-            for date, amount in sorted(daily_spending.items())
-        ]
-        
-        return chart_data
-
-
+        return daily_chart(transaction_dates(transactions), transaction_values(transactions))
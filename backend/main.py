@@ -3,30 +3,62 @@ DAILYAGI Backend - FastAPI with ROMA Orchestration
 Main entry point for the LifeOS Agent system
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
 import socketio
 
 from agents.reminders import RemindersAgent
 from agents.spending import SpendingAgent
 from agents.grocery import GroceryAgent
-from utils.enclave import MockEnclave
-from utils.ipfs import IPFSStorage
+from utils.services import get_services
+from utils.batching import get_batch_scheduler
+from utils.reasoning_cache import get_reasoning_cache
+from utils.reminder_store import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.image_ingest import MAX_UPLOAD_BYTES, UploadTooLarge, content_length_exceeds, prepare_image
 
 load_dotenv()
 
+# Shared service clients, created once and injected into every agent
+services = get_services()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared clients on startup and close them on shutdown"""
+    services.reminder_scheduler.dispatch = dispatch_due_reminders
+    await services.startup()
+    yield
+    await services.shutdown()
+
+
 app = FastAPI(
     title="DAILYAGI API",
     description="Decentralized AI Life Assistant Backend",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# CORS middleware
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse grocery uploads whose declared size is too large before the body is read"""
+    if request.url.path == "/agent/grocery" and content_length_exceeds(request.headers.get("content-length")):
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload exceeds {MAX_UPLOAD_BYTES} bytes"}
+        )
+    return await call_next(request)
+
+
+# CORS middleware (added last so it wraps every response, including rejections above)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, specify your frontend URL
@@ -39,12 +71,24 @@ app.add_middleware(
 sio = socketio.AsyncServer(cors_allowed_origins="*", async_mode='asgi')
 socket_app = socketio.ASGIApp(sio, app)
 
+
+async def dispatch_due_reminders(reminders: List[Dict[str, Any]]):
+    """Queue SMS and emit Socket.IO notifications for reminders that just came due"""
+    for reminder in reminders:
+        # The outbox merges several due reminders for one recipient into one SMS
+        await asyncio.to_thread(services.outbox.enqueue, "sms", reminder["address"], {
+            "message": f"Reminder due now: {reminder['title']}"
+        })
+    await asyncio.gather(*(
+        sio.emit('reminder_due', {'address': reminder["address"], 'reminder': reminder})
+        for reminder in reminders
+    ))
+
+
 # Initialize agents
-reminders_agent = RemindersAgent()
-spending_agent = SpendingAgent()
-grocery_agent = GroceryAgent()
-enclave = MockEnclave()
-ipfs = IPFSStorage()
+reminders_agent = RemindersAgent(services)
+spending_agent = SpendingAgent(services)
+grocery_agent = GroceryAgent(services)
 
 # OML Fingerprint (auto-generated for each agent)
 OML_FINGERPRINT = "dailyagi_v1_0x1234567890abcdef"
@@ -68,6 +112,11 @@ class SpendingRequest(BaseModel):
     timeRange: str = "30d"
 
 
+class GroceryPurchase(BaseModel):
+    address: str
+    items: List[str]
+
+
 @app.get("/")
 async def root():
     return {
@@ -85,7 +134,14 @@ async def health():
             "reminders": "active",
             "spending": "active",
             "grocery": "active"
-        }
+        },
+        "inference": {
+            "batching": get_batch_scheduler().metrics(),
+            "cache": get_reasoning_cache().metrics()
+        },
+        "outbox": services.outbox.metrics(),
+        "image_cache": services.image_cache.metrics(),
+        "vision": services.exa.metrics()
     }
 
 
@@ -127,11 +183,16 @@ async def run_agent(request: AgentRequest):
 
 # Reminders Agent Endpoints
 @app.get("/agent/reminders")
-async def get_reminders(address: str):
-    """Get all reminders for an address"""
+async def get_reminders(
+    address: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """Get a page of reminders for an address; pass next_cursor back for the next page"""
     try:
-        reminders = await reminders_agent.get_reminders(address)
-        return {"reminders": reminders}
+        return await reminders_agent.list_reminders(address, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -168,6 +229,24 @@ async def delete_reminder(reminder_id: str, address: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/agent/reminders/calendar/sync")
+async def sync_reminders_from_calendar():
+    """Pull reminder edits and deletions made in Google Calendar"""
+    try:
+        return await reminders_agent.sync_from_calendar()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/agent/reminders/{reminder_id}/complete")
+async def complete_reminder(reminder_id: str, address: str):
+    """Mark a reminder as completed"""
+    result = await reminders_agent.complete_reminder(address, reminder_id)
+    if not result["success"]:
+        raise HTTPException(status_code=404, detail="Reminder not found")
+    return result
+
+
 # Spending Agent Endpoints
 @app.post("/agent/spending")
 async def analyze_spending(request: SpendingRequest):
@@ -190,6 +269,34 @@ async def analyze_spending(request: SpendingRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/agent/spending/stream")
+async def analyze_spending_stream(request: SpendingRequest):
+    """
+    Analyze spending for an address, streaming partial results as NDJSON
+    Emits "progress" lines as each chain/page arrives, then one "summary" line
+    """
+    async def generate():
+        try:
+            async for event in spending_agent.analyze_stream(
+                address=request.address,
+                time_range=request.timeRange
+            ):
+                if event["type"] == "summary" and event.get("nudge"):
+                    await sio.emit('spending_nudge', {
+                        'address': request.address,
+                        'message': event['nudge']
+                    })
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Grocery Agent Endpoints
 @app.post("/agent/grocery")
 async def process_grocery(
@@ -197,18 +304,59 @@ async def process_grocery(
     address: str = Form(...)
 ):
     """Process fridge image and generate grocery list"""
+    # Size-check in chunks and shrink to a compact JPEG off the event loop
+    try:
+        image_data = await asyncio.to_thread(prepare_image, image.file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await image.close()
+    
     try:
-        image_data = await image.read()
         result = await grocery_agent.process_image(
             address=address,
             image_data=image_data,
             filename=image.filename or "fridge.jpg"
         )
+        
+        # Emit only what changed since the last photo so clients update in place
+        for change, event in (
+            ("added", "pantry_items_added"),
+            ("removed", "pantry_items_removed"),
+            ("running_low", "pantry_running_low")
+        ):
+            if result["changes"][change]:
+                await sio.emit(event, {
+                    'address': address,
+                    'items': result["changes"][change]
+                })
+        
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/agent/grocery/pantry")
+async def get_pantry(address: str):
+    """Current pantry for an address; pantry_* Socket.IO events carry later changes"""
+    try:
+        items = await asyncio.to_thread(grocery_agent.get_pantry, address)
+        return {"items": items}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/agent/grocery/purchases")
+async def record_grocery_purchases(purchase: GroceryPurchase):
+    """Record items checked off a shopping list; future lists rank them by purchase count"""
+    try:
+        return await grocery_agent.record_purchases(purchase.address, purchase.items)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/agent/grocery/{cid}")
 async def get_grocery_list(cid: str):
     """Retrieve grocery list from IPFS"""
@@ -1,47 +1,81 @@
 #!/usr/bin/env python3
 """
 Simple script to run the backend and show any errors
+Prints how long each startup import takes so slow cold starts are easy to spot
 """
 import sys
 import os
+import time
+import importlib
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Heavy dependencies that should only load on first use, never at startup
+DEFERRED_MODULES = [
+    "transformers",
+    "torch",
+    "huggingface_hub",
+    "googleapiclient",
+    "twilio",
+]
+
+import_times = []
+
+
+def timed_import(module_name: str):
+    """Import a module and record how long it took"""
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - start
+    import_times.append((module_name, elapsed))
+    print(f"   ✓ {module_name} imported ({elapsed * 1000:.0f} ms)")
+    return module
+
+
+def print_startup_report(total: float):
+    """Print per-module import cost and any heavy modules loaded eagerly"""
+    print("\nStartup report")
+    print("-" * 50)
+    for module_name, elapsed in sorted(import_times, key=lambda item: item[1], reverse=True):
+        print(f"   {module_name:<30} {elapsed * 1000:>8.0f} ms")
+    print(f"   {'total (health-ready)':<30} {total * 1000:>8.0f} ms")
+
+    eager = [name for name in DEFERRED_MODULES if name in sys.modules]
+    if eager:
+        print(f"\n   ⚠ Loaded at startup but expected lazily: {', '.join(eager)}")
+
+
 try:
     print("Starting backend...")
     print("=" * 50)
-    
+    startup_begin = time.perf_counter()
+
     # Try importing main components
     print("1. Importing dependencies...")
-    from dotenv import load_dotenv
-    load_dotenv()
+    dotenv = timed_import("dotenv")
+    dotenv.load_dotenv()
     print("   ✓ dotenv loaded")
-    
-    import socketio
-    print("   ✓ socketio imported")
-    
-    from fastapi import FastAPI
-    print("   ✓ fastapi imported")
-    
+
+    timed_import("socketio")
+    timed_import("fastapi")
+
     print("\n2. Importing agents...")
-    from agents.reminders import RemindersAgent
-    print("   ✓ RemindersAgent imported")
-    
-    from agents.spending import SpendingAgent
-    print("   ✓ SpendingAgent imported")
-    
-    from agents.grocery import GroceryAgent
-    print("   ✓ GroceryAgent imported")
-    
-    print("\n3. Starting server...")
+    timed_import("agents.reminders")
+    timed_import("agents.spending")
+    timed_import("agents.grocery")
+
+    print("\n3. Building app...")
+    timed_import("main")
+
+    print_startup_report(time.perf_counter() - startup_begin)
+
+    print("\n4. Starting server...")
     import uvicorn
     uvicorn.run("main:socket_app", host="0.0.0.0", port=8000, reload=True)
-    
+
 except Exception as e:
     print(f"\n❌ ERROR: {e}")
     import traceback
     traceback.print_exc()
     sys.exit(1)
-
-
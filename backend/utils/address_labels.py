@@ -0,0 +1,216 @@
+"""
+Memory-mapped index of known contract/merchant addresses
+Maps a transaction's counterparty address to a spending category in O(1)
+"""
+
+import csv
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils.db import data_path
+
+DEFAULT_LABELS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "address_labels.csv"
+)
+
+MAGIC = b"DAGIADDR1"
+# Slot layout: 20-byte address, uint16 category code (0 = empty slot), uint32 label offset
+SLOT = struct.Struct("<20sHI")
+NO_LABEL = 0xFFFFFFFF
+
+
+def parse_address(address: Optional[str]) -> Optional[bytes]:
+    """0x-prefixed hex address to 20 raw bytes, or None if it is not one"""
+    if not address:
+        return None
+    value = address.strip().lower()
+    if value.startswith("0x"):
+        value = value[2:]
+    if len(value) != 40:
+        return None
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        return None
+
+
+def load_snapshot(path: str) -> List[Tuple[str, str, str]]:
+    """
+    Read (address, category, label) rows from a CSV or JSON snapshot
+    CSV columns: address,category[,label]
+    JSON: {"0x..": "category"} or [{"address", "category", "label"}]
+    """
+    rows = []
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            rows = [(address, category, "") for address, category in data.items()]
+        else:
+            rows = [
+                (entry.get("address", ""), entry.get("category", ""), entry.get("label", ""))
+                for entry in data
+            ]
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for entry in csv.DictReader(f):
+                rows.append((entry.get("address", ""), entry.get("category", ""), entry.get("label") or ""))
+    return rows
+
+
+def build_index(snapshot_path: str, index_path: str) -> None:
+    """Compile a snapshot into the open-addressing hash table file read by AddressLabelIndex"""
+    entries: Dict[bytes, Tuple[str, str]] = {}
+    for address, category, label in load_snapshot(snapshot_path):
+        raw = parse_address(address)
+        if raw is not None and category:
+            entries[raw] = (category.strip().lower(), label.strip())
+
+    categories = sorted({category for category, _ in entries.values()})
+    codes = {category: i + 1 for i, category in enumerate(categories)}
+    # Keep the table at most half full so probe sequences stay short
+    n_slots = max(8, len(entries) * 2)
+
+    slots: List[Optional[Tuple[bytes, int, int]]] = [None] * n_slots
+    labels = bytearray()
+    for raw, (category, label) in entries.items():
+        label_offset = NO_LABEL
+        if label:
+            encoded = label.encode("utf-8")[:0xFFFF]
+            label_offset = len(labels)
+            labels += struct.pack("<H", len(encoded)) + encoded
+        slot = _slot_for(raw, n_slots)
+        while slots[slot] is not None:
+            slot = (slot + 1) % n_slots
+        slots[slot] = (raw, codes[category], label_offset)
+
+    header = bytearray(MAGIC)
+    header += struct.pack("<IH", n_slots, len(categories))
+    for category in categories:
+        encoded = category.encode("utf-8")
+        header += struct.pack("<H", len(encoded)) + encoded
+
+    directory = os.path.dirname(index_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(struct.pack("<I", len(header) + 4))
+            f.write(header)
+            empty = SLOT.pack(b"\0" * 20, 0, NO_LABEL)
+            for entry in slots:
+                f.write(SLOT.pack(*entry) if entry is not None else empty)
+            f.write(labels)
+        # Atomic swap so other workers never see a half-written index
+        os.replace(tmp_path, index_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def _slot_for(raw: bytes, n_slots: int) -> int:
+    # Addresses are hash-derived, so their leading bytes are already uniform
+    return int.from_bytes(raw[:8], "little") % n_slots
+
+
+class AddressLabelIndex:
+    """Read-only, memory-mapped address -> category index"""
+
+    def __init__(self, snapshot_path: Optional[str] = None, index_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path or os.getenv("ADDRESS_LABELS_PATH", DEFAULT_LABELS_PATH)
+        # The compiled index is derived state, so it lives in the data directory
+        self.index_path = index_path or data_path(os.path.basename(self.snapshot_path) + ".idx")
+        self.categories: List[str] = []
+        self._map: Optional[mmap.mmap] = None
+        self._n_slots = 0
+        self._slots_offset = 0
+        self._labels_offset = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            stale = (
+                not os.path.exists(self.index_path)
+                or os.path.getmtime(self.index_path) < os.path.getmtime(self.snapshot_path)
+            )
+            if stale:
+                build_index(self.snapshot_path, self.index_path)
+            with open(self.index_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception as e:
+            print(f"Address label index disabled: {e}")
+            self._map = None
+            return
+
+        header_size = struct.unpack_from("<I", self._map, 0)[0]
+        offset = 4
+        if self._map[offset:offset + len(MAGIC)] != MAGIC:
+            print("Address label index disabled: bad index file")
+            self._map = None
+            return
+        offset += len(MAGIC)
+        self._n_slots, n_categories = struct.unpack_from("<IH", self._map, offset)
+        offset += 6
+        for _ in range(n_categories):
+            (length,) = struct.unpack_from("<H", self._map, offset)
+            offset += 2
+            self.categories.append(self._map[offset:offset + length].decode("utf-8"))
+            offset += length
+        self._slots_offset = header_size
+        self._labels_offset = header_size + self._n_slots * SLOT.size
+
+    def _find(self, address: Optional[str]) -> Optional[Tuple[int, int]]:
+        if self._map is None or not self._n_slots:
+            return None
+        raw = parse_address(address)
+        if raw is None:
+            return None
+        slot = _slot_for(raw, self._n_slots)
+        for _ in range(self._n_slots):
+            stored, code, label_offset = SLOT.unpack_from(self._map, self._slots_offset + slot * SLOT.size)
+            if code == 0:
+                return None
+            if stored == raw:
+                return code, label_offset
+            slot = (slot + 1) % self._n_slots
+        return None
+
+    def category(self, address: Optional[str]) -> Optional[str]:
+        """Category for a known address, or None if it is not in the index"""
+        found = self._find(address)
+        return self.categories[found[0] - 1] if found else None
+
+    def label(self, address: Optional[str]) -> Optional[str]:
+        """Human-readable name for a known address, if the snapshot has one"""
+        found = self._find(address)
+        if not found or found[1] == NO_LABEL:
+            return None
+        offset = self._labels_offset + found[1]
+        (length,) = struct.unpack_from("<H", self._map, offset)
+        return self._map[offset + 2:offset + 2 + length].decode("utf-8")
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+_index: Optional[AddressLabelIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_address_label_index() -> AddressLabelIndex:
+    """Return the process-wide address label index"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = AddressLabelIndex()
+    return _index
@@ -0,0 +1,123 @@
+"""
+Micro-batching scheduler for Dobby text generation
+Collects prompts that arrive close together and runs them as one batched generate
+"""
+
+import asyncio
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.inference import InferenceExecutor, generate_batch, get_inference_executor
+
+
+class BatchScheduler:
+    """
+    Groups concurrent prompts into batches.
+
+    A batch is flushed when it reaches `max_batch` prompts or when
+    `window_ms` has passed since its first prompt arrived, whichever comes
+    first. Prompts with different max_length are batched separately since
+    they need different generation arguments.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[InferenceExecutor] = None,
+        window_ms: Optional[float] = None,
+        max_batch: Optional[int] = None
+    ):
+        self.executor = executor or get_inference_executor()
+        self.window_ms = window_ms if window_ms is not None else float(os.getenv("DOBBY_BATCH_WINDOW_MS", "20"))
+        self.max_batch = max_batch or int(os.getenv("DOBBY_BATCH_SIZE", "8"))
+        self._pending: Dict[Optional[int], List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[Optional[int], asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.prompts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch > 1
+
+    async def generate(
+        self,
+        prompt: str,
+        max_length: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Queue a prompt for the next batch and wait for its own result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(max_length, [])
+        batch.append((prompt, future))
+
+        if len(batch) >= self.max_batch:
+            self._flush(max_length)
+        elif len(batch) == 1:
+            self._timers[max_length] = loop.call_later(
+                self.window_ms / 1000, self._flush, max_length
+            )
+
+        if timeout is None:
+            return await future
+        # Shield so one caller giving up does not cancel results for the batch
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+
+    def _flush(self, max_length: Optional[int]) -> None:
+        timer = self._timers.pop(max_length, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(max_length, None)
+        if not batch:
+            return
+
+        self.batches += 1
+        self.prompts += len(batch)
+        task = asyncio.ensure_future(self._run_batch(batch, max_length))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]], max_length: Optional[int]) -> None:
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            results = await self.executor.submit(generate_batch, prompts, max_length)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), text in zip(batch, results):
+            if not future.done():
+                future.set_result(text)
+
+    def metrics(self) -> Dict[str, float]:
+        """Batch counters, including the average fill rate of flushed batches"""
+        fill_rate = self.prompts / (self.batches * self.max_batch) if self.batches else 0.0
+        return {
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "avg_batch_size": round(self.prompts / self.batches, 2) if self.batches else 0.0,
+            "fill_rate": round(fill_rate, 4),
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch
+        }
+
+
+_scheduler: Optional[BatchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_batch_scheduler() -> BatchScheduler:
+    """Return the process-wide batch scheduler"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = BatchScheduler()
+    return _scheduler
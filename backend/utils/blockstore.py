@@ -0,0 +1,89 @@
+"""
+Local content-addressed blockstore
+Blocks are files named by CID and read back by memory-mapping, with an
+in-memory LRU of hot blocks on top
+"""
+
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from utils.db import data_path
+
+
+class Blockstore:
+    """Flat-file blockstore sharded by the next-to-last two characters of the CID"""
+
+    def __init__(self, root: Optional[str] = None, cache_bytes: Optional[int] = None):
+        self.root = root or os.getenv("IPFS_BLOCKSTORE_DIR") or data_path("blocks")
+        self.cache_bytes = cache_bytes or int(os.getenv("IPFS_CACHE_BYTES", str(32 * 1024 * 1024)))
+        os.makedirs(self.root, exist_ok=True)
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, cid: str) -> str:
+        shard = cid[-3:-1] if len(cid) >= 3 else "_"
+        return os.path.join(self.root, shard, cid)
+
+    def has(self, cid: str) -> bool:
+        with self._lock:
+            if cid in self._cache:
+                return True
+        return os.path.exists(self._path(cid))
+
+    def put(self, cid: str, data: bytes) -> None:
+        """Write a block durably; blocks are immutable so existing ones are kept"""
+        path = self._path(cid)
+        if not os.path.exists(path):
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        self._remember(cid, data)
+
+    def get_cached(self, cid: str) -> Optional[bytes]:
+        """Block from the in-memory LRU only, without touching disk"""
+        with self._lock:
+            data = self._cache.get(cid)
+            if data is not None:
+                self._cache.move_to_end(cid)
+            return data
+
+    def get(self, cid: str) -> Optional[bytes]:
+        """Block from the LRU, else memory-mapped from disk; None if absent"""
+        data = self.get_cached(cid)
+        if data is not None:
+            return data
+        try:
+            with open(self._path(cid), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    data = b""
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        data = mapped[:]
+        except FileNotFoundError:
+            return None
+        self._remember(cid, data)
+        return data
+
+    def _remember(self, cid: str, data: bytes) -> None:
+        if len(data) > self.cache_bytes:
+            return
+        with self._lock:
+            if cid in self._cache:
+                self._cache.move_to_end(cid)
+                return
+            self._cache[cid] = data
+            self._cached_bytes += len(data)
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
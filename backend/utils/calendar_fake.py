@@ -0,0 +1,172 @@
+"""
+In-memory stand-in for the Google Calendar API
+Implements the events().insert/patch/delete/list and batch request surface that
+CalendarSyncEngine uses, so sync can run locally without credentials
+(GOOGLE_CALENDAR_FAKE=true) and be exercised against predictable responses
+"""
+
+import copy
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+# Google rejects batch requests with more calls than this
+MAX_BATCH = 50
+
+
+class FakeHttpError(Exception):
+    """Error with the resp.status shape of googleapiclient's HttpError"""
+
+    class _Response:
+        def __init__(self, status: int):
+            self.status = status
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"<HttpError {status}: {message}>")
+        self.resp = self._Response(status)
+
+
+class FakeRequest:
+    def __init__(self, service: "FakeCalendarService", handler: Callable[[], Any]):
+        self._service = service
+        self._handler = handler
+
+    def execute(self) -> Any:
+        with self._service._lock:
+            self._service.round_trips += 1
+            return self._handler()
+
+
+class FakeBatchRequest:
+    def __init__(self, service: "FakeCalendarService", callback: Optional[Callable] = None):
+        self._service = service
+        self._callback = callback
+        self._requests: List[tuple] = []
+
+    def add(self, request: FakeRequest, request_id: Optional[str] = None) -> None:
+        self._requests.append((request_id or str(len(self._requests)), request))
+
+    def execute(self) -> None:
+        if len(self._requests) > MAX_BATCH:
+            raise FakeHttpError(400, f"Batch has more than {MAX_BATCH} calls")
+        with self._service._lock:
+            self._service.round_trips += 1
+            outcomes = []
+            for request_id, request in self._requests:
+                try:
+                    outcomes.append((request_id, request._handler(), None))
+                except FakeHttpError as e:
+                    outcomes.append((request_id, None, e))
+        # Callbacks run outside the lock, as they would after a real response arrives
+        if self._callback is not None:
+            for request_id, response, exception in outcomes:
+                self._callback(request_id, response, exception)
+
+
+class FakeEvents:
+    def __init__(self, service: "FakeCalendarService"):
+        self._service = service
+
+    def insert(self, calendarId: str, body: Dict[str, Any]) -> FakeRequest:
+        return FakeRequest(self._service, lambda: self._service._insert(calendarId, body))
+
+    def patch(self, calendarId: str, eventId: str, body: Dict[str, Any]) -> FakeRequest:
+        return FakeRequest(self._service, lambda: self._service._patch(calendarId, eventId, body))
+
+    def delete(self, calendarId: str, eventId: str) -> FakeRequest:
+        return FakeRequest(self._service, lambda: self._service._delete(calendarId, eventId))
+
+    def list(self, calendarId: str, **params: Any) -> FakeRequest:
+        return FakeRequest(self._service, lambda: self._service._list(calendarId, params))
+
+
+class FakeCalendarService:
+    """
+    Calendars held in memory.
+
+    Every change bumps a sequence number; sync tokens are the sequence a
+    listing ended at, so an incremental list returns events changed after it.
+    expire_sync_tokens() makes older tokens fail with 410 like Google does.
+    round_trips counts HTTP requests (a batch is one).
+    """
+
+    def __init__(self, page_size: int = 250):
+        self.page_size = page_size
+        self.round_trips = 0
+        self._calendars: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._sequence = 0
+        self._oldest_token = 0
+        self._lock = threading.RLock()
+
+    def events(self) -> FakeEvents:
+        return FakeEvents(self)
+
+    def new_batch_http_request(self, callback: Optional[Callable] = None) -> FakeBatchRequest:
+        return FakeBatchRequest(self, callback)
+
+    def expire_sync_tokens(self) -> None:
+        with self._lock:
+            self._oldest_token = self._sequence + 1
+
+    def _events(self, calendar_id: str) -> Dict[str, Dict[str, Any]]:
+        return self._calendars.setdefault(calendar_id, {})
+
+    def _touch(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        self._sequence += 1
+        event["sequence"] = self._sequence
+        return copy.deepcopy(event)
+
+    def _live_event(self, calendar_id: str, event_id: str) -> Dict[str, Any]:
+        event = self._events(calendar_id).get(event_id)
+        if event is None or event["status"] == "cancelled":
+            raise FakeHttpError(404, "Not Found")
+        return event
+
+    def _insert(self, calendar_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        events = self._events(calendar_id)
+        event_id = body.get("id") or uuid.uuid4().hex
+        if event_id in events:
+            raise FakeHttpError(409, "The requested identifier already exists.")
+        event = {**copy.deepcopy(body), "id": event_id, "status": "confirmed"}
+        events[event_id] = event
+        return self._touch(event)
+
+    def _patch(self, calendar_id: str, event_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        event = self._live_event(calendar_id, event_id)
+        event.update(copy.deepcopy({key: value for key, value in body.items() if key != "id"}))
+        return self._touch(event)
+
+    def _delete(self, calendar_id: str, event_id: str) -> str:
+        event = self._events(calendar_id).get(event_id)
+        if event is None:
+            raise FakeHttpError(404, "Not Found")
+        if event["status"] == "cancelled":
+            raise FakeHttpError(410, "Resource has been deleted")
+        event["status"] = "cancelled"
+        self._touch(event)
+        return ""
+
+    def _list(self, calendar_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        token = params.get("syncToken")
+        if token is not None and int(token) < self._oldest_token:
+            raise FakeHttpError(410, "Sync token is no longer valid, a full sync is required.")
+        since = int(token) if token is not None else 0
+        show_deleted = params.get("showDeleted") or token is not None
+
+        matching = sorted(
+            (
+                event for event in self._events(calendar_id).values()
+                if event["sequence"] > since and (show_deleted or event["status"] != "cancelled")
+            ),
+            key=lambda event: event["sequence"]
+        )
+        offset = int(params.get("pageToken") or 0)
+        page_size = int(params.get("maxResults") or self.page_size)
+        page = matching[offset:offset + page_size]
+
+        response: Dict[str, Any] = {"items": [copy.deepcopy(event) for event in page]}
+        if offset + page_size < len(matching):
+            response["nextPageToken"] = str(offset + page_size)
+        else:
+            response["nextSyncToken"] = str(self._sequence)
+        return response
@@ -0,0 +1,280 @@
+"""
+Google Calendar sync engine
+Pushes reminder inserts, updates and deletes as batch requests and pulls
+calendar-side changes back with incremental sync tokens
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from utils.db import connect, data_path
+
+# Google accepts at most 50 calls in one batch request
+MAX_BATCH = 50
+
+# Private extended property that ties an event back to its reminder
+REMINDER_PROPERTY = "dailyagi_reminder_id"
+
+# Graphite, so completed reminders stay visible but fade into the background
+COMPLETED_COLOR = "8"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS event_map (
+    reminder_id TEXT PRIMARY KEY,
+    event_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS event_map_by_event ON event_map (event_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    calendar_id TEXT PRIMARY KEY,
+    sync_token TEXT
+);
+"""
+
+
+def event_body(
+    title: str,
+    description: str,
+    start_time: str,
+    reminder_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Calendar event resource for a reminder; events last one hour"""
+    start = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+    end = start + timedelta(hours=1)
+    event = {
+        'summary': title,
+        'description': description,
+        'start': {
+            'dateTime': start.isoformat(),
+            'timeZone': 'UTC',
+        },
+        'end': {
+            'dateTime': end.isoformat(),
+            'timeZone': 'UTC',
+        },
+    }
+    if reminder_id:
+        event['extendedProperties'] = {'private': {REMINDER_PROPERTY: reminder_id}}
+    return event
+
+
+def event_id_for(reminder_id: str) -> Optional[str]:
+    """
+    Deterministic event id for a reminder (Calendar ids use base32hex: a-v, 0-9),
+    so a retried insert cannot create a duplicate event
+    """
+    candidate = reminder_id.replace("-", "").lower()
+    if 5 <= len(candidate) <= 1024 and all(c in "0123456789abcdefghijklmnopqrstuv" for c in candidate):
+        return candidate
+    return None
+
+
+def _http_status(exception: Exception) -> Optional[int]:
+    resp = getattr(exception, "resp", None)
+    status = getattr(resp, "status", None)
+    return int(status) if status is not None else None
+
+
+class CalendarSyncEngine:
+    """
+    Keeps Calendar events in step with reminders.
+
+    apply() takes a list of operations, each a dict with "op" (insert, update
+    or delete), "reminder_id" and, for insert/update, "title", "description",
+    "start_time" and optionally "completed". The reminder id to event id map is kept locally so
+    updates and deletes need no lookups. The engine only talks to the object
+    returned by googleapiclient's build(), so any fake with the same
+    events()/new_batch_http_request() surface can stand in for it
+    (utils.calendar_fake.FakeCalendarService is one).
+    """
+
+    def __init__(self, service, calendar_id: str = "primary", path: Optional[str] = None):
+        self.service = service
+        self.calendar_id = calendar_id
+        self.path = path or os.getenv("CALENDAR_SYNC_DB_PATH") or data_path("calendar_sync.sqlite3")
+        self._db = connect(self.path)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # The service shares one httplib2.Http, which is not thread-safe; outbox
+        # workers and pull_changes run in different threads
+        self._api_lock = threading.Lock()
+
+    def event_id(self, reminder_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT event_id FROM event_map WHERE reminder_id = ?", (reminder_id,)
+            ).fetchone()
+        return row["event_id"] if row else None
+
+    def _map_event(self, reminder_id: str, event_id: Optional[str]) -> None:
+        with self._lock:
+            if event_id is None:
+                self._db.execute("DELETE FROM event_map WHERE reminder_id = ?", (reminder_id,))
+            else:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO event_map (reminder_id, event_id) VALUES (?, ?)",
+                    (reminder_id, event_id)
+                )
+
+    def _request(self, operation: Dict[str, Any]):
+        """API request for one operation, or None if there is nothing to send"""
+        events = self.service.events()
+        reminder_id = operation["reminder_id"]
+        event_id = self.event_id(reminder_id)
+
+        if operation["op"] == "delete":
+            if event_id is None:
+                return None
+            return events.delete(calendarId=self.calendar_id, eventId=event_id)
+
+        body = event_body(
+            operation.get("title", ""),
+            operation.get("description", ""),
+            operation["start_time"],
+            reminder_id
+        )
+        if operation.get("completed"):
+            body['colorId'] = COMPLETED_COLOR
+        if event_id is None:
+            new_id = event_id_for(reminder_id)
+            if new_id:
+                body['id'] = new_id
+            return events.insert(calendarId=self.calendar_id, body=body)
+        return events.patch(calendarId=self.calendar_id, eventId=event_id, body=body)
+
+    def apply(self, operations: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Send operations in batch requests of up to 50 calls.
+        Returns one result per operation: True, or an error message.
+        """
+        if not self.service:
+            for operation in operations:
+                print(f"Mock calendar {operation['op']}: {operation.get('title', operation['reminder_id'])}")
+            return [True] * len(operations)
+
+        results: List[Any] = [True] * len(operations)
+        # Only the latest operation per reminder matters: it carries the newest
+        # content, and a delete after an unsent insert needs no request at all
+        latest = {operation["reminder_id"]: index for index, operation in enumerate(operations)}
+        pending = []
+        for index in sorted(latest.values()):
+            operation = operations[index]
+            try:
+                request = self._request(operation)
+            except Exception as e:
+                results[index] = f"Invalid calendar operation: {e}"
+                continue
+            if request is not None:
+                pending.append((index, request))
+
+        for start in range(0, len(pending), MAX_BATCH):
+            chunk = pending[start:start + MAX_BATCH]
+
+            def callback(request_id, response, exception):
+                index = int(request_id)
+                operation = operations[index]
+                if exception is not None:
+                    # Events already gone from the calendar count as deleted
+                    if operation["op"] == "delete" and _http_status(exception) in (404, 410):
+                        self._map_event(operation["reminder_id"], None)
+                        return
+                    # The event already exists (an earlier insert landed unrecorded):
+                    # map it; an update is then retried as a patch by the outbox
+                    new_id = event_id_for(operation["reminder_id"])
+                    if operation["op"] != "delete" and new_id and _http_status(exception) == 409:
+                        self._map_event(operation["reminder_id"], new_id)
+                        if operation["op"] == "insert":
+                            return
+                    results[index] = str(exception)
+                    return
+                if operation["op"] == "delete":
+                    self._map_event(operation["reminder_id"], None)
+                elif response and response.get("id"):
+                    self._map_event(operation["reminder_id"], response["id"])
+
+            batch = self.service.new_batch_http_request(callback=callback)
+            for index, request in chunk:
+                batch.add(request, request_id=str(index))
+            try:
+                with self._api_lock:
+                    batch.execute()
+            except Exception as e:
+                for index, _ in chunk:
+                    results[index] = f"Calendar batch failed: {e}"
+        return results
+
+    def _sync_token(self) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sync_token FROM sync_state WHERE calendar_id = ?", (self.calendar_id,)
+            ).fetchone()
+        return row["sync_token"] if row else None
+
+    def _set_sync_token(self, token: Optional[str]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state (calendar_id, sync_token) VALUES (?, ?)",
+                (self.calendar_id, token)
+            )
+
+    def _reminder_for_event(self, event: Dict[str, Any]) -> Optional[str]:
+        private = event.get("extendedProperties", {}).get("private", {})
+        if private.get(REMINDER_PROPERTY):
+            return private[REMINDER_PROPERTY]
+        with self._lock:
+            row = self._db.execute(
+                "SELECT reminder_id FROM event_map WHERE event_id = ?", (event.get("id"),)
+            ).fetchone()
+        return row["reminder_id"] if row else None
+
+    def pull_changes(self) -> List[Dict[str, Any]]:
+        """
+        Reminder events changed in the calendar since the last pull.
+        The first pull only records a sync token; an expired token (410) starts over.
+        """
+        if not self.service:
+            return []
+
+        token = self._sync_token()
+        changes = []
+        page_token = None
+        while True:
+            params = {"calendarId": self.calendar_id, "showDeleted": True, "singleEvents": True}
+            if token:
+                params["syncToken"] = token
+            if page_token:
+                params["pageToken"] = page_token
+            try:
+                with self._api_lock:
+                    response = self.service.events().list(**params).execute()
+            except Exception as e:
+                if token and _http_status(e) == 410:
+                    self._set_sync_token(None)
+                    return self.pull_changes()
+                raise
+
+            if token:
+                for event in response.get("items", []):
+                    reminder_id = self._reminder_for_event(event)
+                    if reminder_id is None:
+                        continue
+                    change = {"reminder_id": reminder_id, "event_id": event.get("id")}
+                    if event.get("status") == "cancelled":
+                        change["status"] = "cancelled"
+                        self._map_event(reminder_id, None)
+                    else:
+                        change["status"] = "updated"
+                        change["title"] = event.get("summary", "")
+                        change["description"] = event.get("description", "")
+                        change["start_time"] = event.get("start", {}).get("dateTime")
+                    changes.append(change)
+
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                self._set_sync_token(response.get("nextSyncToken"))
+                return changes
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
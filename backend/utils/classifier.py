@@ -0,0 +1,123 @@
+"""
+Compiled keyword classifier for transaction descriptions
+All category keywords are compiled into one Aho-Corasick automaton, so the cost
+of classifying a description depends on its length, not on the size of the table
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_CATEGORIES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "categories.json"
+)
+
+_NO_MATCH = 1 << 30
+
+
+class KeywordClassifier:
+    """
+    Maps a description to the first category (in table order) that has any
+    keyword occurring in it as a substring, or to the default category.
+    """
+
+    def __init__(
+        self,
+        categories: Sequence[Tuple[str, Iterable[str]]],
+        default: str = "other",
+        cache_size: int = 10000
+    ):
+        self.categories = [name for name, _ in categories]
+        self.default = default
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Best (lowest) category priority matched when reaching each state
+        self._best: List[int] = [_NO_MATCH]
+        for priority, (_, keywords) in enumerate(categories):
+            for keyword in keywords:
+                self._add(keyword.lower(), priority)
+        self._build_failure_links()
+        self._classify_cached = lru_cache(maxsize=cache_size)(self._classify)
+
+    @classmethod
+    def from_file(cls, path: str, cache_size: int = 10000) -> "KeywordClassifier":
+        """Load a category table from JSON ({"default": ..., "categories": [{name, keywords}]})"""
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        categories = [
+            (entry["name"], entry.get("keywords", []))
+            for entry in config.get("categories", [])
+        ]
+        return cls(categories, default=config.get("default", "other"), cache_size=cache_size)
+
+    def _add(self, keyword: str, priority: int) -> None:
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(_NO_MATCH)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._best[state] = min(self._best[state], priority)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Inherit matches that end here via the failure chain
+                self._best[next_state] = min(self._best[next_state], self._best[self._fail[next_state]])
+
+    def _classify(self, description: str) -> str:
+        goto, fail, best_at = self._goto, self._fail, self._best
+        state = 0
+        best = _NO_MATCH
+        for char in description:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best_at[state] < best:
+                best = best_at[state]
+                if best == 0:
+                    break
+        return self.categories[best] if best != _NO_MATCH else self.default
+
+    def classify(self, description: Optional[str]) -> str:
+        """Classify one description (results are memoized per description)"""
+        if not description:
+            return self.default
+        return self._classify_cached(description.lower())
+
+    def classify_many(self, descriptions: Iterable[Optional[str]]) -> List[str]:
+        """Classify a batch of descriptions in one call"""
+        classify = self.classify
+        return [classify(description) for description in descriptions]
+
+
+_classifier: Optional[KeywordClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_transaction_classifier() -> KeywordClassifier:
+    """Return the process-wide classifier, loaded from TX_CATEGORIES_PATH"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                path = os.getenv("TX_CATEGORIES_PATH", DEFAULT_CATEGORIES_PATH)
+                _classifier = KeywordClassifier.from_file(path)
+    return _classifier
@@ -2,78 +2,243 @@
 Covalent API client for fetching blockchain transactions
 """
 
+import asyncio
 import os
-import requests
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from datetime import datetime, timezone
+
+from utils.address_labels import get_address_label_index
+from utils.http import RETRY_STATUSES, backoff_delay, retry_after_seconds
+
+DEFAULT_CHAINS = [137, 8453]  # Polygon, Base
+
+
+class PaginationTruncated(Exception):
+    """Paging stopped at COVALENT_MAX_PAGES before reaching its start bound"""
+
 
 class CovalentClient:
     """Handle blockchain transaction fetching via Covalent API"""
-    
+
     def __init__(self):
         self.api_key = os.getenv("COVALENT_KEY")
-        self.base_url = "https://api.covalenthq.com/v1"
-    
+        self.base_url = os.getenv("COVALENT_BASE_URL", "https://api.covalenthq.com/v1").rstrip("/")
+        chains = os.getenv("COVALENT_CHAINS")
+        self.chains = [int(c) for c in chains.split(",") if c.strip()] if chains else list(DEFAULT_CHAINS)
+        self.page_size = int(os.getenv("COVALENT_PAGE_SIZE", "100"))
+        self.max_pages = int(os.getenv("COVALENT_MAX_PAGES", "50"))
+        self.max_per_host = int(os.getenv("COVALENT_MAX_PER_HOST", "8"))
+        self.max_retries = int(os.getenv("COVALENT_MAX_RETRIES", "4"))
+        self.timeout = float(os.getenv("COVALENT_TIMEOUT", "30"))
+        self._session = None
+
+    async def _get_session(self):
+        """Shared connection pool, created on first use"""
+        if self._session is None or self._session.closed:
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.max_per_host,  # caps in-flight requests per host
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET with retries and jittered backoff on 429/5xx and connection errors"""
+        import aiohttp
+        session = await self._get_session()
+
+        for attempt in range(self.max_retries + 1):
+            delay = None
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    if response.status not in RETRY_STATUSES or attempt == self.max_retries:
+                        error_text = await response.text()
+                        raise RuntimeError(f"Covalent API error {response.status}: {error_text[:200]}")
+                    delay = retry_after_seconds(response.headers.get("Retry-After"))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+            await asyncio.sleep(delay if delay is not None else backoff_delay(attempt))
+
+        raise RuntimeError("Covalent API retries exhausted")
+
+    async def iter_pages(
+        self,
+        address: str,
+        chain_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        after_block: Optional[int] = None,
+        start_page: int = 0
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield pages of transactions for one chain, newest first, from start_page on
+        Stops once a page reaches past start_date or back to after_block
+        (the last block already synced), or the API has no more pages.
+        Raises PaginationTruncated after the last page if max_pages ran out first.
+        """
+        url = f"{self.base_url}/{chain_id}/address/{address}/transactions_v2/"
+        start_ts = to_epoch(start_date) if start_date else None
+        end_ts = to_epoch(end_date) if end_date else None
+
+        for page_number in range(start_page, start_page + self.max_pages):
+            data = await self._get_json(url, {
+                "key": self.api_key,
+                "page-size": self.page_size,
+                "page-number": page_number
+            })
+            payload = data.get("data") or {}
+            items = payload.get("items") or []
+
+            page = []
+            reached_start = False
+            for item in items:
+                tx = self._to_transaction(item, chain_id)
+                block_height = tx["block_height"]
+                if after_block is not None and block_height is not None and block_height <= after_block:
+                    reached_start = True
+                    continue
+                signed_at = parse_timestamp(tx["timestamp"])
+                if signed_at is not None:
+                    if end_ts is not None and signed_at > end_ts:
+                        continue
+                    if start_ts is not None and signed_at < start_ts:
+                        reached_start = True
+                        continue
+                page.append(tx)
+
+            if page:
+                yield page
+
+            pagination = payload.get("pagination") or {}
+            if reached_start or not items or not pagination.get("has_more"):
+                return
+
+        raise PaginationTruncated(f"Stopped after {self.max_pages} pages for chain {chain_id}")
+
+    async def iter_transactions(
+        self,
+        address: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        chains: Optional[List[int]] = None,
+        after_blocks: Optional[Dict[int, int]] = None,
+        start_pages: Optional[Dict[int, int]] = None
+    ) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Fetch all chains concurrently and yield (chain_id, page) as pages arrive
+        start_pages resumes a chain's paging at a page number (default 0)
+        A failing chain is logged and skipped, the others keep streaming
+        After each chain finishes cleanly, (chain_id, None) is yielded as a marker;
+        a chain cut short by max_pages yields (chain_id, False) instead
+        """
+        chains = chains or self.chains
+        after_blocks = after_blocks or {}
+        start_pages = start_pages or {}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=len(chains) * 2)
+
+        async def pump(chain_id: int) -> None:
+            status = "failed"
+            try:
+                async for page in self.iter_pages(
+                    address, chain_id, start_date, end_date, after_blocks.get(chain_id),
+                    start_pages.get(chain_id, 0)
+                ):
+                    await queue.put((chain_id, page))
+                status = "completed"
+            except PaginationTruncated as e:
+                print(f"Covalent sync incomplete: {e}")
+                status = "truncated"
+            except Exception as e:
+                print(f"Covalent API error for chain {chain_id}: {e}")
+            # Not in a finally: a cancelled pump must not block on a full queue
+            await queue.put((chain_id, status))
+
+        tasks = [asyncio.create_task(pump(chain_id)) for chain_id in chains]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                chain_id, page = await queue.get()
+                if isinstance(page, str):
+                    remaining -= 1
+                    if page == "completed":
+                        yield chain_id, None
+                    elif page == "truncated":
+                        yield chain_id, False
+                    continue
+                yield chain_id, page
+        finally:
+            # The consumer may stop early; cancel pumps still waiting on the queue
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def get_transactions(
         self,
         address: str,
         start_date: datetime,
         end_date: datetime,
-        chains: List[int] = [137, 8453]  # Polygon, Base
+        chains: Optional[List[int]] = None
     ) -> List[Dict[str, Any]]:
         """Fetch transactions for an address"""
         if not self.api_key:
             # Return mock transactions
             return self._get_mock_transactions()
-        
+
         all_transactions = []
-        
-        for chain_id in chains:
-            try:
-                url = f"{self.base_url}/{chain_id}/address/{address}/transactions_v2/"
-                params = {
-                    "key": self.api_key,
-                    "page-size": 100
-                }
-                
-                response = requests.get(url, params=params)
-                if response.status_code == 200:
-                    data = response.json()
-                    items = data.get("data", {}).get("items", [])
-                    
-                    for item in items:
-                        tx = {
-                            "hash": item.get("tx_hash", ""),
-                            "value": float(item.get("value", 0)) / 1e18,  # Convert from wei
-                            "timestamp": item.get("block_signed_at", ""),
-                            "from": item.get("from_address", ""),
-                            "to": item.get("to_address", ""),
-                            "description": self._generate_description(item)
-                        }
-                        all_transactions.append(tx)
-            except Exception as e:
-                print(f"Covalent API error for chain {chain_id}: {e}")
-        
+        async for _, page in self.iter_transactions(address, start_date, end_date, chains):
+            if page:
+                all_transactions.extend(page)
         return all_transactions
-    
+
+    def _to_transaction(self, item: Dict[str, Any], chain_id: int) -> Dict[str, Any]:
+        """Convert a Covalent item into our transaction dict"""
+        return {
+            "hash": item.get("tx_hash", ""),
+            "value": float(item.get("value") or 0) / 1e18,  # Convert from wei
+            "timestamp": item.get("block_signed_at", ""),
+            "from": item.get("from_address", ""),
+            "to": item.get("to_address", ""),
+            "description": self._generate_description(item),
+            "chain_id": chain_id,
+            "block_height": item.get("block_height")
+        }
+
     def _generate_description(self, tx_item: Dict[str, Any]) -> str:
         """Generate human-readable description from transaction"""
-        to_address = tx_item.get("to_address", "")
-        value = float(tx_item.get("value", 0)) / 1e18
-        
-        # Simple description based on value and address
+        to_address = tx_item.get("to_address") or ""
+        value = float(tx_item.get("value") or 0) / 1e18
+
+        # Simple description based on value, naming the counterparty when it is known.
+        # Raw addresses stay in "to": hex in the text would trip keyword matches
+        # and make nearly every description unique
         if value < 0.01:
-            return "Small transaction"
+            description = "Small transaction"
         elif value < 1:
-            return "Medium transaction"
+            description = "Medium transaction"
         else:
-            return f"Large transaction: ${value:.2f}"
-    
+            description = f"Large transaction: ${value:.2f}"
+        label = get_address_label_index().label(to_address) if to_address else None
+        if label:
+            description += f" to {label}"
+        return description
+
     def _get_mock_transactions(self) -> List[Dict[str, Any]]:
         """Return mock transactions for testing"""
         from datetime import timedelta
         now = datetime.now()
-        
+
         return [
             {
                 "hash": "0x1234567890abcdef",
@@ -102,3 +267,18 @@ class CovalentClient:
         ]
 
 
+def parse_timestamp(value: str) -> Optional[float]:
+    """Parse an ISO timestamp (Covalent uses a trailing Z) into epoch seconds"""
+    if not value:
+        return None
+    try:
+        return to_epoch(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    except ValueError:
+        return None
+
+
+def to_epoch(value: datetime) -> float:
+    """Epoch seconds, treating naive datetimes as local time like datetime.now()"""
+    if value.tzinfo is None:
+        return value.timestamp()
+    return value.astimezone(timezone.utc).timestamp()
@@ -0,0 +1,42 @@
+"""
+SQLite helpers shared by the local stores
+The stores claim work with UPDATE ... RETURNING, which needs SQLite 3.35 or newer
+"""
+
+import os
+import sqlite3
+
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+# Local state (SQLite databases, spools) lives here unless overridden
+DATA_DIR = os.getenv(
+    "DAILYAGI_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+)
+
+
+def data_path(name: str) -> str:
+    """Path of a file inside the local data directory"""
+    return os.path.join(DATA_DIR, name)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database tuned for several threads and worker processes
+    WAL lets readers proceed while another process writes
+    """
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(
+            f"SQLite {sqlite3.sqlite_version} is too old; "
+            f"{'.'.join(map(str, MIN_SQLITE_VERSION))} or newer is required"
+        )
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
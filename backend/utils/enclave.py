@@ -2,7 +2,6 @@
 Mock Sentient Enclave wrapper for private inference
 """
 
-import torch
 from typing import Any, Callable
 
 class MockEnclave:
@@ -19,6 +18,9 @@ class MockEnclave:
         Run inference in a private enclave
         Uses torch.no_grad() as a mock for private execution
         """
+        # Deferred so importing the enclave does not load torch
+        import torch
+        
         with torch.no_grad():
             # Mock private inference
             if hasattr(model, '__call__'):
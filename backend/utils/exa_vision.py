@@ -2,47 +2,167 @@
 Exa Vision API client for image analysis
 """
 
-import os
+import asyncio
 import base64
-import aiohttp
-from typing import List, Dict, Any
+import os
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an upstream is down.
+
+    Opens after threshold consecutive failures; while open every call is
+    refused until reset_after seconds pass, then a single trial call is let
+    through and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> Optional[str]:
+        """"closed" for a normal call, "trial" for the half-open trial, None if refused"""
+        state = self.state
+        if state == "closed":
+            return "closed"
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return "trial"
+        return None
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Let another trial through after one ended without an outcome (e.g. cancelled)"""
+        self._trial_in_flight = False
+
 
 class ExaVisionClient:
     """Handle image analysis via Exa Vision API"""
     
     def __init__(self):
         self.api_key = os.getenv("EXA_KEY")
-        self.base_url = "https://api.exa.ai"
+        self.base_url = os.getenv("EXA_BASE_URL", "https://api.exa.ai").rstrip("/")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}" if self.api_key else None,
             "Content-Type": "application/json"
         }
+        self.timeout = float(os.getenv("EXA_TIMEOUT", "20"))
+        self.max_per_host = int(os.getenv("EXA_MAX_PER_HOST", "8"))
+        self.breaker = CircuitBreaker(
+            threshold=int(os.getenv("EXA_BREAKER_THRESHOLD", "5")),
+            reset_after=float(os.getenv("EXA_BREAKER_RESET", "30"))
+        )
+        self._semaphore = asyncio.Semaphore(int(os.getenv("EXA_CONCURRENCY", "4")))
+        self._session = None
+        self._sdk_client = None
+        self._sdk_probed = False
+        self.stats = {"requests": 0, "failures": 0, "short_circuited": 0}
     
-    async def detect_items(self, image_data: bytes) -> List[str]:
-        """Detect items in fridge image using Exa Vision API"""
+    def _get_sdk_client(self):
+        """exa-py client if the SDK is installed; the import is only attempted once"""
+        if not self._sdk_probed:
+            self._sdk_probed = True
+            try:
+                from exa import Exa
+                self._sdk_client = Exa(api_key=self.api_key)
+            except ImportError:
+                self._sdk_client = None
+        return self._sdk_client
+    
+    async def _get_session(self):
+        """Shared keep-alive connection pool, created on first use"""
+        if self._session is None or self._session.closed:
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.max_per_host,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={k: v for k, v in self.headers.items() if v is not None}
+            )
+        return self._session
+    
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "breaker": self.breaker.state}
+    
+    async def detect_items(self, image_data: bytes) -> Tuple[List[str], bool]:
+        """
+        Detect items in fridge image using Exa Vision API
+        Returns (items, degraded); degraded is True when items are the mock
+        fallback rather than a real detection, and must not update any pantry
+        """
         if not self.api_key:
             # Return mock detected items if API key not configured
-            return self._mock_detect_items()
+            return self._mock_detect_items(), True
         
-        try:
-            # Encode image to base64
-            image_b64 = base64.b64encode(image_data).decode('utf-8')
+        async with self._semaphore:
+            # Checked after queueing so a batch stops calling as soon as the breaker opens
+            admitted = self.breaker.allow()
+            if admitted is None:
+                # Upstream is failing; answer immediately instead of waiting on timeouts
+                self.stats["short_circuited"] += 1
+                return self._mock_detect_items(), True
             
-            # Try using exa-py SDK first (if available)
+            self.stats["requests"] += 1
             try:
-                from exa import Exa
-                exa_client = Exa(api_key=self.api_key)
-                # Note: Exa SDK may have different methods - adjust based on actual SDK
-                # This is a placeholder for the actual implementation
-                return await self._detect_with_exa_sdk(exa_client, image_data)
-            except ImportError:
-                # Fallback to direct API call using aiohttp
-                return await self._detect_with_api(image_b64)
-                
-        except Exception as e:
-            print(f"Exa Vision API error: {e}")
-            # Fallback to mock detection on error
-            return self._mock_detect_items()
+                exa_client = self._get_sdk_client()
+                if exa_client is not None:
+                    call = self._detect_with_exa_sdk(exa_client, image_data)
+                else:
+                    # Fallback to direct API call using aiohttp
+                    image_b64 = base64.b64encode(image_data).decode('utf-8')
+                    call = self._detect_with_api(image_b64)
+                items = await asyncio.wait_for(call, timeout=self.timeout)
+                self.breaker.record_success()
+            except asyncio.CancelledError:
+                # CancelledError is not an Exception; a cancelled trial must not wedge the breaker
+                if admitted == "trial":
+                    self.breaker.release_trial()
+                raise
+            except Exception as e:
+                print(f"Exa Vision API error: {e}")
+                self.stats["failures"] += 1
+                self.breaker.record_failure()
+                # Fallback to mock detection on error
+                return self._mock_detect_items(), True
+        
+        # An empty result is a real answer: the fridge is empty
+        return items, False
+    
+    async def detect_batch(self, images: List[bytes]) -> List[Tuple[List[str], bool]]:
+        """Detect items in several images concurrently (bounded by EXA_CONCURRENCY)"""
+        return list(await asyncio.gather(*(self.detect_items(image) for image in images)))
     
     async def _detect_with_exa_sdk(self, exa_client, image_data: bytes) -> List[str]:
         """Use exa-py SDK for image analysis"""
@@ -51,45 +171,41 @@ class ExaVisionClient:
         # Example structure:
         # result = await exa_client.analyze_image(image_data)
         # return result.get("items", [])
-        return self._mock_detect_items()
+        # Until then use the HTTP endpoint, so mock items never pass for a detection
+        return await self._detect_with_api(base64.b64encode(image_data).decode('utf-8'))
     
     async def _detect_with_api(self, image_b64: str) -> List[str]:
-        """Make direct API call to Exa Vision using aiohttp"""
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Exa Vision API endpoint (adjust based on actual API documentation)
-                url = f"{self.base_url}/v1/vision/analyze"
-                
-                payload = {
-                    "image": image_b64,
-                    "task": "object_detection",  # Detect objects in image
-                    "context": "fridge_contents"  # Context for better detection
-                }
-                
-                async with session.post(
-                    url,
-                    json=payload,
-                    headers={k: v for k, v in self.headers.items() if v is not None}
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        # Extract detected items from response
-                        # Adjust based on actual Exa API response structure
-                        items = data.get("items", [])
-                        if isinstance(items, list) and len(items) > 0:
-                            # If items are objects, extract names
-                            if isinstance(items[0], dict):
-                                return [item.get("name", item.get("label", "")) for item in items if item.get("name") or item.get("label")]
-                            # If items are strings
-                            return items
-                        return self._mock_detect_items()
-                    else:
-                        error_text = await response.text()
-                        print(f"Exa API error {response.status}: {error_text}")
-                        return self._mock_detect_items()
-            except aiohttp.ClientError as e:
-                print(f"HTTP client error: {e}")
-                return self._mock_detect_items()
+        """
+        Make direct API call to Exa Vision over the shared session
+        Returns [] when the response has no items; raises on HTTP errors
+        """
+        session = await self._get_session()
+        
+        # Exa Vision API endpoint (adjust based on actual API documentation)
+        url = f"{self.base_url}/v1/vision/analyze"
+        
+        payload = {
+            "image": image_b64,
+            "task": "object_detection",  # Detect objects in image
+            "context": "fridge_contents"  # Context for better detection
+        }
+        
+        async with session.post(url, json=payload) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise RuntimeError(f"Exa API error {response.status}: {error_text[:200]}")
+            data = await response.json()
+        
+        # Extract detected items from response
+        # Adjust based on actual Exa API response structure
+        items = data.get("items", [])
+        if isinstance(items, list) and len(items) > 0:
+            # If items are objects, extract names
+            if isinstance(items[0], dict):
+                return [item.get("name", item.get("label", "")) for item in items if item.get("name") or item.get("label")]
+            # If items are strings
+            return items
+        return []
     
     def _mock_detect_items(self) -> List[str]:
         """Mock item detection - used when API is unavailable or for testing"""
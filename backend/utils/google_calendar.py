@@ -3,68 +3,49 @@ Google Calendar client for reminder synchronization
 """
 
 import os
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+import threading
 
 class GoogleCalendarClient:
     """Handle Google Calendar integration"""
     
     def __init__(self):
         self.credentials_path = os.getenv("GOOGLE_CREDENTIALS_PATH")
-        self.service = None
+        self._service = None
+        self._service_built = False
+        self._service_lock = threading.Lock()
+        self.use_fake = os.getenv("GOOGLE_CALENDAR_FAKE", "false").lower() in ("1", "true", "yes")
         
-        if self.credentials_path and os.path.exists(self.credentials_path):
-            try:
-                creds = Credentials.from_authorized_user_file(
-                    self.credentials_path,
-                    ['https://www.googleapis.com/auth/calendar']
-                )
-                if creds.expired and creds.refresh_token:
-                    creds.refresh(Request())
-                self.service = build('calendar', 'v3', credentials=creds)
-            except Exception as e:
-                print(f"Google Calendar init error: {e}")
-        else:
+        if not self.use_fake and not (self.credentials_path and os.path.exists(self.credentials_path)):
+            self._service_built = True
             print("Warning: Google Calendar credentials not configured")
     
-    async def create_event(
-        self,
-        title: str,
-        description: str,
-        start_time: str
-    ) -> bool:
-        """Create calendar event"""
-        if not self.service:
-            print(f"Mock calendar event: {title} at {start_time}")
-            return True
-        
+    @property
+    def service(self):
+        """Calendar API service, built on first use so googleapiclient is not imported at startup"""
+        if not self._service_built:
+            with self._service_lock:
+                if not self._service_built:
+                    self._service = self._build_service()
+                    self._service_built = True
+        return self._service
+    
+    def _build_service(self):
+        if self.use_fake:
+            from utils.calendar_fake import FakeCalendarService
+            print("Using in-memory fake Google Calendar")
+            return FakeCalendarService()
         try:
-            from datetime import datetime
-            start = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-            end = start.replace(hour=start.hour + 1)
-            
-            event = {
-                'summary': title,
-                'description': description,
-                'start': {
-                    'dateTime': start.isoformat(),
-                    'timeZone': 'UTC',
-                },
-                'end': {
-                    'dateTime': end.isoformat(),
-                    'timeZone': 'UTC',
-                },
-            }
+            from google.oauth2.credentials import Credentials
+            from googleapiclient.discovery import build
+            from google.auth.transport.requests import Request
             
-            event = self.service.events().insert(
-                calendarId='primary',
-                body=event
-            ).execute()
-            
-            return event.get('id') is not None
+            creds = Credentials.from_authorized_user_file(
+                self.credentials_path,
+                ['https://www.googleapis.com/auth/calendar']
+            )
+            if creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            return build('calendar', 'v3', credentials=creds)
         except Exception as e:
-            print(f"Google Calendar error: {e}")
-            return False
-
-
+            print(f"Google Calendar init error: {e}")
+            return None
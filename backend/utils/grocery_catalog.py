@@ -0,0 +1,194 @@
+"""
+Grocery catalog with normalized name/synonym indexes
+Detections are resolved to catalog items through phrase and token indexes built
+once at load time, so matching cost does not grow with the size of the catalog
+"""
+
+import csv
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "grocery_catalog.json"
+)
+
+_NON_WORD = re.compile(r"[^a-z0-9%]+")
+# Longest label (in catalog tokens) whose sub-phrases are all looked up
+MAX_LABEL_TOKENS = 8
+
+_LEADING_COUNT = re.compile(r"^\s*(\d+(?:\.\d+)?)\s+([a-z]+)")
+
+# Words after a leading number that make it a size, not a count ("12 oz yogurt")
+_UNITS = frozenset({
+    "oz", "fl", "lb", "lbs", "g", "gram", "grams", "kg", "mg", "ml", "l", "liter", "liters",
+    "litre", "litres", "gal", "gallon", "gallons", "qt", "quart", "quarts", "pt", "pint",
+    "pints", "cup", "cups", "pack", "packs", "pk", "bottle", "bottles", "can", "cans",
+    "jar", "jars", "box", "boxes", "bag", "bags", "loaf", "loaves", "bunch", "head", "dozen"
+})
+
+
+def _singular(token: str) -> str:
+    if len(token) <= 3 or token.endswith(("ss", "us", "is")):
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("oes", "sses", "xes", "ches", "shes")):
+        return token[:-2]
+    if token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercase, strip punctuation and singularize: "Bell Peppers!" -> ["bell", "pepper"]"""
+    return [_singular(token) for token in _NON_WORD.split(text.lower()) if token]
+
+
+class GroceryCatalog:
+    """
+    Catalog items with default quantity, category and synonyms.
+
+    A detection matches an item when its normalized text equals the item's
+    name or a synonym, when it is part of one ("chicken" -> Chicken Breast),
+    or when it contains one ("fresh whole milk" -> Milk).
+    """
+
+    def __init__(self, items: Iterable[Mapping[str, Any]], max_list_size: int = 10):
+        self.items: List[Dict[str, str]] = []
+        self.max_list_size = max_list_size
+        self._by_name: Dict[str, int] = {}
+        self._phrases: Dict[str, Set[int]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        # Items by the token set of a name/synonym, for detections that contain one
+        self._token_sets: Dict[frozenset, Set[int]] = {}
+        essentials = []
+
+        for entry in items:
+            index = len(self.items)
+            self.items.append({
+                "name": entry["name"],
+                "quantity": entry.get("quantity", "1"),
+                "category": entry.get("category", "Other")
+            })
+            self._by_name[entry["name"].lower()] = index
+            if entry.get("essential"):
+                essentials.append(index)
+
+            for phrase in [entry["name"], *entry.get("synonyms", [])]:
+                tokens = normalize(phrase)
+                if not tokens:
+                    continue
+                self._phrases.setdefault(" ".join(tokens), set()).add(index)
+                self._token_sets.setdefault(frozenset(tokens), set()).add(index)
+                for token in tokens:
+                    self._postings.setdefault(token, set()).add(index)
+
+        self.essentials = frozenset(essentials)
+
+    @classmethod
+    def from_file(cls, path: str) -> "GroceryCatalog":
+        """
+        Load a catalog from JSON ({"max_list_size": ..., "items": [{name, quantity,
+        category, synonyms, essential}]}) or, for large SKU exports, CSV with
+        columns name,quantity,category,synonyms,essential (synonyms separated by "|")
+        """
+        if path.endswith(".csv"):
+            items = []
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    if not row.get("name"):
+                        continue
+                    items.append({
+                        "name": row["name"].strip(),
+                        "quantity": (row.get("quantity") or "1").strip(),
+                        "category": (row.get("category") or "Other").strip(),
+                        "synonyms": [s.strip() for s in (row.get("synonyms") or "").split("|") if s.strip()],
+                        "essential": (row.get("essential") or "").strip().lower() in ("1", "true", "yes")
+                    })
+            return cls(items)
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config.get("items", []), max_list_size=config.get("max_list_size", 10))
+
+    def index_of(self, name: str) -> Optional[int]:
+        return self._by_name.get(name.lower())
+
+    def match(self, detected: str) -> Set[int]:
+        """Indexes of the catalog items a detected label refers to"""
+        tokens = normalize(detected)
+        if not tokens:
+            return set()
+        exact = self._phrases.get(" ".join(tokens))
+        if exact:
+            return set(exact)
+
+        postings = sorted((self._postings.get(token, set()) for token in tokens), key=len)
+        # Every token occurs in the item's name or a synonym
+        matched = set.intersection(*postings) if postings[0] else set()
+        # Or the detection contains a whole name/synonym: look up each subset of
+        # its tokens, so the cost depends on the label, not on the catalog
+        known = sorted({token for token in tokens if token in self._postings})[:MAX_LABEL_TOKENS]
+        for mask in range(1, 1 << len(known)):
+            subset = frozenset(token for bit, token in enumerate(known) if mask >> bit & 1)
+            matched |= self._token_sets.get(subset, set())
+        return matched
+
+    def present(self, detected_items: Iterable[str]) -> Set[int]:
+        """Catalog items covered by any of the detections"""
+        found: Set[int] = set()
+        for detected in detected_items:
+            found |= self.match(detected)
+        return found
+
+    def quantities(self, detected_items: Iterable[str]) -> Dict[int, float]:
+        """
+        Estimated count of each detected catalog item: every detection adds
+        its leading number when the item name follows it ("6 eggs"), else 1
+        ("12 oz yogurt" is one yogurt)
+        """
+        totals: Dict[int, float] = {}
+        for detected in detected_items:
+            count = _LEADING_COUNT.match(detected.lower())
+            amount = float(count.group(1)) if count and count.group(2) not in _UNITS else 1.0
+            for index in self.match(detected):
+                totals[index] = totals.get(index, 0.0) + amount
+        return totals
+
+    def missing(
+        self,
+        detected_items: Iterable[str],
+        household_counts: Optional[Mapping[str, int]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Items to buy: essentials plus anything the household buys, minus what
+        was detected, most frequently bought first (catalog order breaks ties)
+        """
+        counts: Dict[int, int] = {}
+        for name, count in (household_counts or {}).items():
+            index = self.index_of(name)
+            if index is not None:
+                counts[index] = count
+
+        wanted = (self.essentials | counts.keys()) - self.present(detected_items)
+        ranked = sorted(wanted, key=lambda index: (-counts.get(index, 0), index))
+        limit = self.max_list_size if limit is None else limit
+        return [dict(self.items[index]) for index in ranked[:limit]]
+
+
+_catalog: Optional[GroceryCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_grocery_catalog() -> GroceryCatalog:
+    """Return the process-wide catalog, loaded from GROCERY_CATALOG_PATH"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                path = os.getenv("GROCERY_CATALOG_PATH", DEFAULT_CATALOG_PATH)
+                _catalog = GroceryCatalog.from_file(path)
+    return _catalog
@@ -0,0 +1,24 @@
+"""
+HTTP helpers shared by the API clients
+"""
+
+import random
+from typing import Optional
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(value: Optional[str], cap: float = 60.0) -> Optional[float]:
+    """Parse a Retry-After header given in seconds, capped so one bad header cannot stall a caller"""
+    if not value:
+        return None
+    try:
+        return min(cap, max(0.0, float(value)))
+    except ValueError:
+        return None
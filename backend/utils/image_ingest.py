@@ -0,0 +1,78 @@
+"""
+Bounded ingestion for uploaded photos
+Checks the upload size in chunks, then decodes at reduced resolution and
+re-encodes a compact JPEG, so memory per request stays small
+"""
+
+import io
+import os
+from typing import BinaryIO, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("GROCERY_MAX_UPLOAD_MB", "10")) * 1024 * 1024)
+MAX_DIMENSION = int(os.getenv("GROCERY_IMAGE_MAX_DIM", "1024"))
+JPEG_QUALITY = int(os.getenv("GROCERY_JPEG_QUALITY", "85"))
+# Refuse images that would decode to more pixels than this (decompression bombs)
+MAX_PIXELS = int(os.getenv("GROCERY_MAX_PIXELS", str(50_000_000)))
+
+
+class UploadTooLarge(Exception):
+    """Upload exceeds the configured maximum size"""
+
+
+def check_upload_size(fileobj: BinaryIO, max_bytes: int = MAX_UPLOAD_BYTES) -> int:
+    """Read the upload in chunks to measure it, failing as soon as it is too large"""
+    fileobj.seek(0)
+    total = 0
+    while True:
+        chunk = fileobj.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+    fileobj.seek(0)
+    return total
+
+
+def prepare_image(
+    fileobj: BinaryIO,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    max_dimension: int = MAX_DIMENSION,
+    quality: int = JPEG_QUALITY
+) -> bytes:
+    """
+    Size-check an uploaded image and return it as a JPEG no larger than
+    max_dimension on either side. Blocking; run it in a worker thread.
+    Raises UploadTooLarge, or ValueError if the data is not a usable image.
+    """
+    from PIL import Image, ImageOps
+
+    check_upload_size(fileobj, max_bytes)
+    try:
+        with Image.open(fileobj) as image:
+            width, height = image.size
+            if width * height > MAX_PIXELS:
+                raise ValueError(f"Image is too large to decode ({width}x{height})")
+            # JPEG decoders can scale by 1/2, 1/4 or 1/8 while decoding
+            image.draft("RGB", (max_dimension, max_dimension))
+            image.thumbnail((max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            out = io.BytesIO()
+            image.save(out, format="JPEG", quality=quality, optimize=True)
+    except (UploadTooLarge, ValueError):
+        raise
+    except Exception as e:
+        raise ValueError(f"Unsupported image: {e}") from e
+    return out.getvalue()
+
+
+def content_length_exceeds(value: Optional[str], max_bytes: int = MAX_UPLOAD_BYTES) -> bool:
+    """True if a request's Content-Length already rules the upload out (allows form overhead)"""
+    try:
+        return value is not None and int(value) > max_bytes + CHUNK_SIZE
+    except ValueError:
+        return False
@@ -0,0 +1,155 @@
+"""
+Inference executor for Dobby reasoning
+Runs blocking text generation off the event loop with bounded concurrency
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.model_registry import get_model_registry
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when the inference queue is at capacity"""
+
+
+def generate_text(prompt: str, max_length: Optional[int] = None) -> str:
+    """
+    Run one generation with the shared model
+    Module-level so it can be pickled into a process pool worker
+    """
+    registry = get_model_registry()
+    generator = registry.get_pipeline()
+    result = generator(prompt, **registry.generation_kwargs(max_length))[0]
+    return result.get("generated_text", prompt)
+
+
+def generate_batch(prompts: List[str], max_length: Optional[int] = None) -> List[str]:
+    """
+    Run several prompts through the shared model as one padded batch
+    Module-level so it can be pickled into a process pool worker
+    """
+    registry = get_model_registry()
+    generator = registry.get_pipeline()
+    tokenizer = generator.tokenizer
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    # Decoder-only models must be padded on the left to generate correctly
+    tokenizer.padding_side = "left"
+
+    outputs = generator(
+        prompts,
+        batch_size=len(prompts),
+        pad_token_id=tokenizer.pad_token_id,
+        **registry.generation_kwargs(max_length)
+    )
+    return [
+        output[0].get("generated_text", prompt)
+        for output, prompt in zip(outputs, prompts)
+    ]
+
+
+class InferenceExecutor:
+    """
+    Dedicated executor for CPU-heavy generation calls.
+
+    Up to `workers` generations run at once and up to `queue_size` more may
+    wait for a worker. Submissions beyond that are rejected immediately with
+    InferenceQueueFull so callers can degrade instead of piling up.
+    """
+
+    def __init__(
+        self,
+        kind: Optional[str] = None,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        self.kind = (kind or os.getenv("DOBBY_EXECUTOR", "thread")).lower()
+        self.workers = workers or int(os.getenv("DOBBY_WORKERS", "2"))
+        self.queue_size = queue_size if queue_size is not None else int(os.getenv("DOBBY_QUEUE_SIZE", "32"))
+        self.timeout = timeout or float(os.getenv("DOBBY_TIMEOUT", "30"))
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.stats: Dict[str, int] = {"submitted": 0, "rejected": 0, "timed_out": 0, "failed": 0}
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn avoids forking a parent that may already hold torch threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            elif self.kind == "thread":
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="dobby-inference"
+                )
+            else:
+                raise ValueError(f"Unknown DOBBY_EXECUTOR: {self.kind}")
+        return self._executor
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _release(self, _future: Any) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def submit(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run fn(*args) on the executor and await its result"""
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_size:
+                self.stats["rejected"] += 1
+                raise InferenceQueueFull(
+                    f"Inference queue full ({self._in_flight} in flight)"
+                )
+            self._in_flight += 1
+            self.stats["submitted"] += 1
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        # The slot is held until the work really finishes, even if the
+        # caller stops waiting, so the bound reflects actual worker load
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+
+    def shutdown(self, wait: bool = False) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_executor: Optional[InferenceExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Return the process-wide inference executor"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = InferenceExecutor()
+    return _executor
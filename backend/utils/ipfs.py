@@ -4,59 +4,115 @@ IPFS Storage utility using web3.storage
 
 import os
 import json
+import asyncio
 from typing import Dict, Any, Optional
-try:
-    from web3storage import Client
-except ImportError:
-    Client = None
+
+from utils.blockstore import Blockstore
+from utils.ipfs_queue import WriteBehindQueue
+from utils.ipld import cid_from_str, compute_cid, verify_block
+
 
 class IPFSStorage:
-    """Handle IPFS storage via web3.storage"""
-    
-    def __init__(self):
+    """
+    Handle IPFS storage via web3.storage
+
+    CIDs are computed locally and every block is kept in a local blockstore,
+    so store and retrieve work offline; uploads happen later in batches
+    through a durable write-behind queue, and the gateway is only asked for
+    blocks this node has never seen
+    """
+
+    def __init__(self, blockstore: Optional[Blockstore] = None):
         self.token = os.getenv("WEB3_STORAGE_TOKEN")
+        self.gateway_url = os.getenv("IPFS_GATEWAY_URL", "https://w3s.link/ipfs/").strip()
+        self.gateway_timeout = float(os.getenv("IPFS_GATEWAY_TIMEOUT", "10"))
+        self.blockstore = blockstore or Blockstore()
+        self.queue: Optional[WriteBehindQueue] = None
+        self._session = None
         if self.token:
-            self.client = Client(self.token)
+            self.queue = WriteBehindQueue(self.token, self.blockstore)
         else:
-            self.client = None
-            print("Warning: WEB3_STORAGE_TOKEN not set, IPFS storage disabled")
-    
+            print("Warning: WEB3_STORAGE_TOKEN not set, IPFS uploads disabled (local blockstore only)")
+
+    def start(self) -> None:
+        """Start the background upload worker (called from the app lifespan)"""
+        if self.queue is not None:
+            self.queue.start()
+
+    async def close(self) -> None:
+        if self.queue is not None:
+            await self.queue.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _put_block(self, cid: str, data: bytes) -> None:
+        self.blockstore.put(cid, data)
+        if self.queue is not None:
+            self.queue.enqueue(cid)
+
+    async def _store_block(self, data: bytes) -> str:
+        cid = compute_cid(data)
+        # Small local disk writes, but keep them off the event loop anyway
+        await asyncio.to_thread(self._put_block, cid, data)
+        return cid
+
+    async def _get_block(self, cid: str) -> Optional[bytes]:
+        """Block bytes from memory, then the local blockstore, then the gateway"""
+        data = self.blockstore.get_cached(cid)
+        if data is not None:
+            return data
+        data = await asyncio.to_thread(self.blockstore.get, cid)
+        if data is not None:
+            return data
+        return await self._fetch_from_gateway(cid)
+
+    async def _fetch_from_gateway(self, cid: str) -> Optional[bytes]:
+        """Fetch a missing block from the gateway and keep it if the hash checks out"""
+        if not self.gateway_url:
+            return None
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.gateway_timeout)
+            )
+        url = self.gateway_url.rstrip("/") + "/" + cid
+        try:
+            async with self._session.get(url, params={"format": "raw"}) as response:
+                if response.status != 200:
+                    print(f"IPFS gateway error {response.status} for {cid}")
+                    return None
+                data = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"IPFS gateway error: {e}")
+            return None
+        if not verify_block(cid, data):
+            print(f"IPFS gateway returned data that does not match {cid}")
+            return None
+        await asyncio.to_thread(self.blockstore.put, cid, data)
+        return data
+
     async def store_json(self, data: Dict[str, Any]) -> str:
         """Store JSON data on IPFS and return CID"""
-        if not self.client:
-            # Return mock CID if token not configured
-            return "QmMockCID1234567890abcdef"
-        
-        try:
-            json_str = json.dumps(data)
-            cid = self.client.put(json_str.encode())
-            return cid
-        except Exception as e:
-            print(f"IPFS storage error: {e}")
-            # Return mock CID on error
-            return f"QmMockCID{hash(str(data)) % 1000000}"
-    
+        json_str = json.dumps(data)
+        return await self._store_block(json_str.encode())
+
     async def retrieve_json(self, cid: str) -> Dict[str, Any]:
         """Retrieve JSON data from IPFS"""
-        if not self.client:
-            return {"error": "IPFS client not configured"}
-        
+        # The CID names a local file and a gateway URL, so reject anything malformed first
         try:
-            # In production, use web3.storage client to retrieve
-            # For now, return mock data
-            return {"error": "Retrieval not implemented in mock"}
+            cid_from_str(cid)
+        except ValueError:
+            return {"error": f"Invalid CID: {cid[:80]}"}
+        try:
+            data = await self._get_block(cid)
+            if data is None:
+                return {"error": f"CID not found: {cid}"}
+            return json.loads(data)
         except Exception as e:
             return {"error": f"IPFS retrieval error: {e}"}
-    
+
     async def store_file(self, file_data: bytes, filename: str) -> str:
         """Store file on IPFS and return CID"""
-        if not self.client:
-            return "QmMockFileCID1234567890"
-        
-        try:
-            cid = self.client.put(file_data)
-            return cid
-        except Exception as e:
-            print(f"IPFS file storage error: {e}")
-            return f"QmMockFileCID{hash(filename) % 1000000}"
-
+        return await self._store_block(file_data)
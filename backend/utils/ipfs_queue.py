@@ -0,0 +1,197 @@
+"""
+Write-behind queue for IPFS uploads
+Block data lives in the local blockstore; the spool only records which CIDs are
+still pending. A background worker uploads them in batches as a single CAR file,
+retrying with backoff until the pinning service accepts them
+"""
+
+import asyncio
+import glob
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+from utils.blockstore import Blockstore
+from utils.db import data_path
+from utils.http import backoff_delay
+from utils.ipld import encode_car
+
+BLOCK_SUFFIX = ".block"
+INFLIGHT_SUFFIX = ".inflight"
+
+
+class WriteBehindQueue:
+    """
+    Durable upload queue backed by a spool directory.
+
+    Each pending block is an empty marker file named after its CID. The worker
+    claims markers by renaming them with its pid, so several server processes
+    can share one spool without uploading the same block twice.
+    """
+
+    def __init__(self, token: Optional[str], blockstore: Blockstore, spool_dir: Optional[str] = None):
+        self.token = token
+        self.blockstore = blockstore
+        self.spool_dir = spool_dir or os.getenv("IPFS_SPOOL_DIR") or data_path("ipfs_spool")
+        self.api_url = os.getenv("WEB3_STORAGE_API_URL", "https://api.web3.storage").rstrip("/")
+        self.batch_size = int(os.getenv("IPFS_BATCH_SIZE", "50"))
+        self.batch_bytes = int(os.getenv("IPFS_BATCH_BYTES", str(8 * 1024 * 1024)))
+        self.flush_interval = float(os.getenv("IPFS_FLUSH_INTERVAL", "2"))
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._session = None
+        self._failures = 0
+        self.stats = {"uploaded": 0, "batches": 0, "failed_batches": 0}
+
+    def enqueue(self, cid: str) -> None:
+        """Mark a block already in the blockstore for upload (safe from worker threads)"""
+        path = os.path.join(self.spool_dir, cid + BLOCK_SUFFIX)
+        if os.path.exists(path):
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.spool_dir, suffix=".tmp")
+        os.fsync(fd)
+        os.close(fd)
+        os.replace(tmp_path, path)
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending(self) -> int:
+        return len(glob.glob(os.path.join(self.spool_dir, "*" + BLOCK_SUFFIX)))
+
+    def start(self) -> None:
+        """Start the background upload worker on the running event loop"""
+        if self._worker is not None or not self.token:
+            return
+        self._recover_inflight()
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the worker; anything not yet uploaded stays spooled for next start"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _recover_inflight(self) -> None:
+        """Release claims left behind by processes that are no longer running"""
+        for path in glob.glob(os.path.join(self.spool_dir, "*" + INFLIGHT_SUFFIX)):
+            base, pid, _ = path.rsplit(".", 2)
+            if pid.isdigit() and int(pid) != os.getpid() and _pid_alive(int(pid)):
+                continue
+            try:
+                os.replace(path, base + BLOCK_SUFFIX)
+            except OSError:
+                pass
+
+    def _claim_batch(self) -> List[Tuple[str, str, bytes]]:
+        """Claim up to batch_size spooled blocks (cid, claimed path, data)"""
+        batch = []
+        total = 0
+        paths = sorted(
+            glob.glob(os.path.join(self.spool_dir, "*" + BLOCK_SUFFIX)),
+            key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0
+        )
+        for path in paths:
+            if len(batch) >= self.batch_size or total >= self.batch_bytes:
+                break
+            cid = os.path.basename(path)[:-len(BLOCK_SUFFIX)]
+            claimed = f"{path[:-len(BLOCK_SUFFIX)]}.{os.getpid()}{INFLIGHT_SUFFIX}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # Claimed by another worker
+            data = self.blockstore.get(cid)
+            if data is None:
+                print(f"IPFS block {cid} missing from blockstore, dropping upload")
+                os.unlink(claimed)
+                continue
+            batch.append((cid, claimed, data))
+            total += len(data)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Give concurrent writers a moment to land in the same batch
+            await asyncio.sleep(min(0.2, self.flush_interval))
+
+            while True:
+                try:
+                    uploaded = await self._flush_batch()
+                except Exception as e:
+                    # Keep the worker alive and put this process's claimed blocks back
+                    print(f"IPFS upload worker error: {e}")
+                    self._recover_inflight()
+                    uploaded = False
+                if uploaded is None:
+                    break
+                if not uploaded:
+                    self._failures += 1
+                    await asyncio.sleep(backoff_delay(self._failures, base=1.0, cap=300.0))
+                    break
+                self._failures = 0
+
+    async def _flush_batch(self) -> Optional[bool]:
+        """Upload one claimed batch: True on success, False on failure, None if nothing is pending"""
+        batch = self._claim_batch()
+        if not batch:
+            return None
+        if await self._upload(batch):
+            for _, claimed, _ in batch:
+                os.unlink(claimed)
+            return True
+        # Put the blocks back for the next attempt
+        for cid, claimed, _ in batch:
+            os.replace(claimed, os.path.join(self.spool_dir, cid + BLOCK_SUFFIX))
+        return False
+
+    async def _upload(self, batch: List[Tuple[str, str, bytes]]) -> bool:
+        """Upload a batch as one CAR file"""
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120))
+        _, car = encode_car((cid, data) for cid, _, data in batch)
+        try:
+            async with self._session.post(
+                f"{self.api_url}/car",
+                data=car,
+                headers={
+                    "Authorization": f"Bearer {self.token}",
+                    "Content-Type": "application/vnd.ipld.car"
+                }
+            ) as response:
+                if response.status < 300:
+                    self.stats["uploaded"] += len(batch)
+                    self.stats["batches"] += 1
+                    return True
+                error_text = await response.text()
+                print(f"IPFS batch upload error {response.status}: {error_text[:200]}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"IPFS batch upload error: {e}")
+        self.stats["failed_batches"] += 1
+        return False
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,123 @@
+"""
+Minimal IPLD helpers: local CIDv1 computation and CAR v1 encoding
+Enough to address JSON documents as raw blocks and upload them in batches
+under a single UnixFS directory root
+"""
+
+import base64
+import hashlib
+import re
+from typing import Iterable, List, Tuple
+
+CID_VERSION = 1
+RAW_CODEC = 0x55
+DAG_PB_CODEC = 0x70
+SHA2_256 = 0x12
+
+# Multibase "b" prefix, then lowercase RFC 4648 base32 without padding
+_BASE32_CID = re.compile(r"^b[a-z2-7]{8,200}$")
+
+# UnixFS Data message for a directory: field 1 (Type) = 1 (Directory)
+UNIXFS_DIRECTORY = b"\x08\x01"
+
+
+def varint(value: int) -> bytes:
+    """Unsigned LEB128 varint as used by multiformats"""
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def cid_bytes(data: bytes, codec: int = RAW_CODEC) -> bytes:
+    """Binary CIDv1 (sha2-256) of a block, raw codec unless given"""
+    digest = hashlib.sha256(data).digest()
+    return varint(CID_VERSION) + varint(codec) + varint(SHA2_256) + varint(len(digest)) + digest
+
+
+def cid_to_str(cid: bytes) -> str:
+    """Base32 multibase string form ("b...") of a binary CID"""
+    return "b" + base64.b32encode(cid).decode("ascii").lower().rstrip("=")
+
+
+def cid_from_str(cid: str) -> bytes:
+    """Binary CIDv1 from its base32 string form; raises ValueError for anything else"""
+    if not _BASE32_CID.match(cid):
+        raise ValueError(f"Unsupported CID encoding: {cid[:80]}")
+    body = cid[1:].upper()
+    decoded = base64.b32decode(body + "=" * (-len(body) % 8))
+    if decoded[:1] != varint(CID_VERSION) or cid_to_str(decoded) != cid:
+        raise ValueError(f"Invalid CID: {cid[:80]}")
+    return decoded
+
+
+def compute_cid(data: bytes) -> str:
+    """CID string of a raw block, identical to what the pinning service will report"""
+    return cid_to_str(cid_bytes(data))
+
+
+def verify_block(cid: str, data: bytes) -> bool:
+    """True if data hashes to the given raw-block CID"""
+    return compute_cid(data) == cid
+
+
+def _cbor_head(major: int, length: int) -> bytes:
+    if length < 24:
+        return bytes([(major << 5) | length])
+    if length < 0x100:
+        return bytes([(major << 5) | 24, length])
+    if length < 0x10000:
+        return bytes([(major << 5) | 25]) + length.to_bytes(2, "big")
+    return bytes([(major << 5) | 26]) + length.to_bytes(4, "big")
+
+
+def _car_header(roots: List[bytes]) -> bytes:
+    """DAG-CBOR encoding of {"roots": [CID...], "version": 1}"""
+    out = bytearray(_cbor_head(5, 2))
+    out += _cbor_head(3, 5) + b"roots"
+    out += _cbor_head(4, len(roots))
+    for root in roots:
+        # CIDs are CBOR tag 42 over a byte string with a leading 0x00
+        out += b"\xd8\x2a" + _cbor_head(2, len(root) + 1) + b"\x00" + root
+    out += _cbor_head(3, 7) + b"version" + _cbor_head(0, 1)
+    return bytes(out)
+
+
+def _pb_field(field: int, value: bytes) -> bytes:
+    """Protobuf length-delimited field"""
+    return varint((field << 3) | 2) + varint(len(value)) + value
+
+
+def directory_node(links: Iterable[Tuple[str, bytes, int]]) -> bytes:
+    """
+    dag-pb UnixFS directory block linking (name, binary cid, size) entries
+    Links are sorted by name and fields written in canonical dag-pb order
+    """
+    out = bytearray()
+    for name, cid, size in sorted(links, key=lambda link: link[0].encode("utf-8")):
+        link = _pb_field(1, cid) + _pb_field(2, name.encode("utf-8")) + varint(3 << 3) + varint(size)
+        out += _pb_field(2, link)
+    out += _pb_field(1, UNIXFS_DIRECTORY)
+    return bytes(out)
+
+
+def encode_car(blocks: Iterable[Tuple[str, bytes]]) -> Tuple[str, bytes]:
+    """
+    Pack (cid, data) raw blocks into a CAR v1 file with one root: a UnixFS
+    directory whose entries are named by CID. Returns (root cid, car bytes).
+    """
+    blocks = [(cid, cid_from_str(cid), data) for cid, data in blocks]
+    root = directory_node((cid, binary, len(data)) for cid, binary, data in blocks)
+    root_cid = cid_bytes(root, DAG_PB_CODEC)
+
+    header = _car_header([root_cid])
+    out = bytearray(varint(len(header)) + header)
+    out += varint(len(root_cid) + len(root)) + root_cid + root
+    for _, binary, data in blocks:
+        out += varint(len(binary) + len(data)) + binary + data
+    return cid_to_str(root_cid), bytes(out)
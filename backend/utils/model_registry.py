@@ -0,0 +1,122 @@
+"""
+Process-wide registry for Dobby text-generation models
+Each configured model is loaded once per process and shared by every agent
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    """Generation model settings, read from the environment"""
+
+    model_id: str = "gpt2"  # Placeholder - replace with Dobby model
+    dtype: str = "auto"
+    max_length: int = 200
+    do_sample: bool = True
+    temperature: float = 0.7
+
+    @classmethod
+    def from_env(cls) -> "ModelConfig":
+        return cls(
+            model_id=os.getenv("DOBBY_MODEL_ID", cls.model_id),
+            dtype=os.getenv("DOBBY_MODEL_DTYPE", cls.dtype),
+            max_length=int(os.getenv("DOBBY_MAX_LENGTH", cls.max_length)),
+            do_sample=os.getenv("DOBBY_DO_SAMPLE", "true").lower() in ("1", "true", "yes"),
+            temperature=float(os.getenv("DOBBY_TEMPERATURE", cls.temperature)),
+        )
+
+
+class ModelRegistry:
+    """Loads text-generation pipelines lazily and caches them per model id"""
+
+    def __init__(self, config: Optional[ModelConfig] = None):
+        self.config = config or ModelConfig.from_env()
+        self._pipelines: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get_pipeline(self, model_id: Optional[str] = None) -> Any:
+        """Return the shared pipeline for model_id, loading it on first use"""
+        model_id = model_id or self.config.model_id
+        generator = self._pipelines.get(model_id)
+        if generator is not None:
+            return generator
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            generator = self._pipelines.get(model_id)
+            if generator is None:
+                generator = self._load(model_id)
+                self._pipelines[model_id] = generator
+        return generator
+
+    def _load(self, model_id: str) -> Any:
+        ensure_hf_login()
+        # Imported here so the servers start without paying for transformers/torch
+        from transformers import pipeline
+
+        kwargs: Dict[str, Any] = {}
+        if self.config.dtype != "auto":
+            import torch
+            kwargs["torch_dtype"] = getattr(torch, self.config.dtype)
+
+        print(f"Loading text-generation model '{model_id}'")
+        return pipeline(
+            "text-generation",
+            model=model_id,
+            tokenizer=model_id,
+            **kwargs
+        )
+
+    def generation_kwargs(self, max_length: Optional[int] = None) -> Dict[str, Any]:
+        """Keyword arguments passed to the pipeline on each call"""
+        kwargs: Dict[str, Any] = {
+            "max_length": max_length or self.config.max_length,
+            "do_sample": self.config.do_sample,
+        }
+        if self.config.do_sample:
+            kwargs["temperature"] = self.config.temperature
+        return kwargs
+
+    def loaded_models(self) -> list:
+        return list(self._pipelines)
+
+
+_hf_logged_in = False
+_hf_login_lock = threading.Lock()
+
+
+def ensure_hf_login() -> None:
+    """Log in to Hugging Face once per process if HF_TOKEN is set"""
+    global _hf_logged_in
+    if _hf_logged_in:
+        return
+    with _hf_login_lock:
+        if _hf_logged_in:
+            return
+        _hf_logged_in = True
+        token = os.getenv("HF_TOKEN")
+        if not token:
+            return
+        try:
+            from huggingface_hub import login
+            login(token=token)
+        except Exception:
+            pass  # Already logged in or token invalid
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide model registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,356 @@
+"""
+Durable outbox for third-party deliveries (SMS, Calendar)
+Requests record a pending delivery and return; per-provider workers drain the
+outbox under a token-bucket rate limit and retry failures with backoff
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.db import connect, data_path
+from utils.http import backoff_delay
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    provider TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deliveries_pending ON deliveries (provider, next_attempt_at)
+    WHERE status = 'pending';
+"""
+
+# Sends a group of payloads for one recipient. Raises (or returns False) if the
+# whole group failed, or returns one result per payload: True, or an error string
+Sender = Callable[[str, List[Dict[str, Any]]], Awaitable[Any]]
+
+
+class OutboxStore:
+    """SQLite table of pending deliveries, claimable by several worker processes"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("OUTBOX_DB_PATH") or data_path("outbox.sqlite3")
+        self._db = connect(self.path)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(self, provider: str, recipient: str, payload: Dict[str, Any]) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO deliveries (provider, recipient, payload, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (provider, recipient, json.dumps(payload), now, now)
+            )
+        return cursor.lastrowid
+
+    def next_attempt(self, provider: str) -> Optional[float]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT next_attempt_at FROM deliveries WHERE provider = ? AND status = 'pending' "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (provider,)
+            ).fetchone()
+        return row["next_attempt_at"] if row else None
+
+    def claim(self, provider: str, now: float, limit: int, lease: float) -> List[Dict[str, Any]]:
+        """Claim due deliveries; unacknowledged claims become due again after lease seconds"""
+        with self._lock:
+            rows = self._db.execute(
+                "UPDATE deliveries SET next_attempt_at = ? WHERE id IN ("
+                "SELECT id FROM deliveries WHERE provider = ? AND status = 'pending' "
+                "AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?) RETURNING *",
+                (now + lease, provider, now, limit)
+            ).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "recipient": row["recipient"],
+                "payload": json.loads(row["payload"]),
+                "attempts": row["attempts"],
+                "lease_until": row["next_attempt_at"]
+            }
+            for row in sorted(rows, key=lambda row: row["id"])
+        ]
+
+    def renew(self, deliveries: List[Dict[str, Any]], lease_until: float) -> List[int]:
+        """
+        Extend claims that are still held, i.e. whose lease nobody has replaced
+        since this worker took it. Returns the ids renewed.
+        """
+        renewed = []
+        with self._lock:
+            for delivery in deliveries:
+                cursor = self._db.execute(
+                    "UPDATE deliveries SET next_attempt_at = ? "
+                    "WHERE id = ? AND status = 'pending' AND next_attempt_at = ?",
+                    (lease_until, delivery["id"], delivery["lease_until"])
+                )
+                if cursor.rowcount:
+                    delivery["lease_until"] = lease_until
+                    renewed.append(delivery["id"])
+        return renewed
+
+    def mark_sent(self, delivery_ids: List[int]) -> None:
+        with self._lock:
+            self._db.executemany("DELETE FROM deliveries WHERE id = ?", [(i,) for i in delivery_ids])
+
+    def mark_failed(self, delivery_ids: List[int], error: str, retry_at: Optional[float]) -> None:
+        """Record a failed attempt; retry_at None gives up on the delivery"""
+        status = "pending" if retry_at is not None else "failed"
+        with self._lock:
+            self._db.executemany(
+                "UPDATE deliveries SET attempts = attempts + 1, status = ?, last_error = ?, "
+                "next_attempt_at = COALESCE(?, next_attempt_at) WHERE id = ?",
+                [(status, error[:500], retry_at, i) for i in delivery_ids]
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT provider || ':' || status AS key, COUNT(*) AS n FROM deliveries GROUP BY key"
+            ).fetchall()
+        return {row["key"]: row["n"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class TokenBucket:
+    """Allows rate tokens per second with bursts of up to burst tokens"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class Provider:
+    """
+    Delivery settings for one third-party API.
+
+    group_by controls how a claimed batch is split into send calls: None sends
+    each delivery on its own, "recipient" merges deliveries to the same
+    recipient, and "batch" hands the whole claim (up to batch_size) to one call.
+    """
+    name: str
+    send: Sender
+    rate: float
+    burst: float
+    group_by: Optional[str] = None
+    batch_size: Optional[int] = None
+
+    @classmethod
+    def from_env(cls, name: str, send: Sender, rate: float, burst: float, **options) -> "Provider":
+        prefix = f"OUTBOX_{name.upper()}"
+        return cls(
+            name=name,
+            send=send,
+            rate=float(os.getenv(f"{prefix}_RATE", str(rate))),
+            burst=float(os.getenv(f"{prefix}_BURST", str(burst))),
+            **options
+        )
+
+
+class Outbox:
+    """
+    Outbox store plus one background worker per provider.
+
+    Workers sleep until the next pending delivery is due (or enqueue wakes
+    them), claim a batch, merge deliveries to the same recipient when the
+    provider allows it, and send each group after taking a rate-limit token.
+    Claims are renewed just before each send, so time spent waiting for
+    tokens cannot let another process re-claim and send them again.
+
+    Token buckets are per process: with N processes running workers against
+    one database, a provider's effective rate is up to N times its setting.
+    """
+
+    def __init__(self, providers: List[Provider], store: Optional[OutboxStore] = None):
+        self.providers = {provider.name: provider for provider in providers}
+        self.store = store or OutboxStore()
+        self.batch_size = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+        self.concurrency = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+        self.max_attempts = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+        self.send_timeout = float(os.getenv("OUTBOX_SEND_TIMEOUT", "30"))
+        self.max_sleep = float(os.getenv("OUTBOX_MAX_SLEEP", "30"))
+        # How long a coalescing provider waits after a wakeup so bursts land in one batch
+        self.coalesce_window = float(os.getenv("OUTBOX_COALESCE_MS", "500")) / 1000
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._workers: List[asyncio.Task] = []
+        self.stats = {"sent": 0, "coalesced": 0, "retried": 0, "failed": 0}
+
+    def enqueue(self, provider: str, recipient: str, payload: Dict[str, Any]) -> int:
+        """Record a delivery durably and wake the provider's worker"""
+        if provider not in self.providers:
+            raise ValueError(f"Unknown outbox provider: {provider}")
+        delivery_id = self.store.enqueue(provider, recipient, payload)
+        wakeup = self._wakeups.get(provider)
+        if wakeup is not None:
+            self._loop.call_soon_threadsafe(wakeup.set)
+        return delivery_id
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        for name in self.providers:
+            self._wakeups[name] = asyncio.Event()
+            self._workers.append(asyncio.create_task(self._run(self.providers[name])))
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self._wakeups = {}
+        self.store.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "queued": self.store.counts()}
+
+    async def _run(self, provider: Provider) -> None:
+        bucket = TokenBucket(provider.rate, provider.burst)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        wakeup = self._wakeups[provider.name]
+        lease = self.send_timeout * 2
+
+        while True:
+            now = time.time()
+            try:
+                batch = await asyncio.to_thread(
+                    self.store.claim, provider.name, now, provider.batch_size or self.batch_size, lease
+                )
+                next_at = None if batch else await asyncio.to_thread(self.store.next_attempt, provider.name)
+            except Exception as e:
+                print(f"Outbox error ({provider.name}): {e}")
+                batch, next_at = [], None
+
+            if not batch:
+                delay = self.max_sleep if next_at is None else min(max(next_at - now, 0.05), self.max_sleep)
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=delay)
+                    if provider.group_by:
+                        await asyncio.sleep(self.coalesce_window)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+                continue
+
+            tasks = []
+            for group in self._groups(provider, batch):
+                await bucket.acquire()
+                await semaphore.acquire()
+                # The waits above can outlast the claim; renew it and skip any
+                # delivery another worker has re-claimed in the meantime
+                try:
+                    held = set(await asyncio.to_thread(self.store.renew, group, time.time() + lease))
+                except Exception as e:
+                    print(f"Outbox error ({provider.name}): {e}")
+                    held = set()
+                group = [delivery for delivery in group if delivery["id"] in held]
+                if not group:
+                    semaphore.release()
+                    continue
+                task = asyncio.create_task(self._deliver(provider, group))
+                task.add_done_callback(lambda _: semaphore.release())
+                tasks.append(task)
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, Exception):
+                    print(f"Outbox error ({provider.name}): {result}")
+
+    @staticmethod
+    def _groups(provider: Provider, batch: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        if provider.group_by is None:
+            return [[delivery] for delivery in batch]
+        if provider.group_by == "batch":
+            return [batch]
+        groups: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        for delivery in batch:
+            groups.setdefault(delivery["recipient"], []).append(delivery)
+        return list(groups.values())
+
+    async def _deliver(self, provider: Provider, group: List[Dict[str, Any]]) -> None:
+        try:
+            result = await asyncio.wait_for(
+                provider.send(group[0]["recipient"], [delivery["payload"] for delivery in group]),
+                timeout=self.send_timeout
+            )
+            if result is False:
+                raise RuntimeError("provider rejected the delivery")
+        except Exception as e:
+            await self._record_failure(provider, group, str(e) or type(e).__name__)
+            return
+
+        if isinstance(result, list) and len(result) == len(group):
+            sent = [delivery for delivery, outcome in zip(group, result) if outcome is True]
+            for delivery, outcome in zip(group, result):
+                if outcome is not True:
+                    await self._record_failure(provider, [delivery], str(outcome))
+        else:
+            sent = group
+
+        if sent:
+            await asyncio.to_thread(self.store.mark_sent, [delivery["id"] for delivery in sent])
+            self.stats["sent"] += len(sent)
+            if provider.group_by == "recipient":
+                self.stats["coalesced"] += len(sent) - 1
+
+    async def _record_failure(self, provider: Provider, deliveries: List[Dict[str, Any]], error: str) -> None:
+        ids = [delivery["id"] for delivery in deliveries]
+        attempts = max(delivery["attempts"] for delivery in deliveries) + 1
+        if attempts >= self.max_attempts:
+            print(f"Outbox giving up on {provider.name} delivery {ids}: {error}")
+            retry_at = None
+            self.stats["failed"] += len(deliveries)
+        else:
+            retry_at = time.time() + backoff_delay(attempts, base=2.0, cap=600.0)
+            self.stats["retried"] += len(deliveries)
+        await asyncio.to_thread(self.store.mark_failed, ids, error, retry_at)
+
+
+def create_outbox(services) -> Outbox:
+    """Outbox with the SMS and Calendar providers wired to the shared clients"""
+
+    async def send_sms(recipient: str, payloads: List[Dict[str, Any]]) -> bool:
+        message = "\n".join(payload["message"] for payload in payloads)
+        return await services.twilio.send_reminder_sms(to=recipient, message=message)
+
+    async def send_calendar(recipient: str, payloads: List[Dict[str, Any]]) -> List[Any]:
+        # Calendar operations for every wallet go out together in batch requests
+        return await asyncio.to_thread(services.calendar_sync.apply, payloads)
+
+    return Outbox([
+        Provider.from_env("sms", send_sms, rate=1.0, burst=5, group_by="recipient"),
+        Provider.from_env("calendar", send_calendar, rate=1.0, burst=5, group_by="batch", batch_size=200),
+    ])
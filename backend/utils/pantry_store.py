@@ -0,0 +1,194 @@
+"""
+Per-wallet pantry state
+Tracks which catalog items are in each wallet's fridge, with an estimated
+quantity, diffs every new detection against the previous one, and counts
+the purchases used to rank shopping lists
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from utils.db import connect, data_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS item_stats (
+    address TEXT NOT NULL,
+    item TEXT NOT NULL,
+    times_seen INTEGER NOT NULL DEFAULT 0,
+    last_seen REAL,
+    present INTEGER NOT NULL DEFAULT 0,
+    quantity REAL NOT NULL DEFAULT 0,
+    times_bought INTEGER NOT NULL DEFAULT 0,
+    last_bought REAL,
+    PRIMARY KEY (address, item)
+);
+-- cid is NULL while the upload of a reserved list is in flight
+CREATE TABLE IF NOT EXISTS last_list (
+    address TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    cid TEXT,
+    stored_at REAL NOT NULL
+);
+"""
+
+
+class PantryStore:
+    """SQLite pantry per wallet: current items, quantities, purchase counts and the last stored list"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("PANTRY_DB_PATH") or data_path("pantry.sqlite3")
+        # Present items at or below this estimated quantity are reported as running low
+        self.low_quantity = float(os.getenv("PANTRY_LOW_QUANTITY", "1"))
+        self._db = connect(self.path)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def apply_detection(
+        self,
+        address: str,
+        quantities: Mapping[str, float],
+        seen_at: Optional[float] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Replace the wallet's pantry with a new detection (item -> estimated quantity)
+        and return what changed: "added", "removed" and "running_low" items
+        """
+        address = address.lower()
+        seen_at = seen_at or time.time()
+        changes: Dict[str, List[Dict[str, Any]]] = {"added": [], "removed": [], "running_low": []}
+
+        with self._lock:
+            # IMMEDIATE: uploads from the same wallet in other processes diff in turn
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                previous = {
+                    row["item"]: row
+                    for row in self._db.execute(
+                        "SELECT item, quantity, last_seen FROM item_stats WHERE address = ? AND present = 1",
+                        (address,)
+                    )
+                }
+                for item, quantity in quantities.items():
+                    before = previous.get(item)
+                    if before is None:
+                        changes["added"].append({"name": item, "quantity": quantity})
+                    elif quantity < before["quantity"] and quantity <= self.low_quantity:
+                        changes["running_low"].append({"name": item, "quantity": quantity})
+                for item in previous.keys() - quantities.keys():
+                    changes["removed"].append({"name": item, "last_seen": previous[item]["last_seen"]})
+
+                self._db.executemany(
+                    """
+                    INSERT INTO item_stats (address, item, times_seen, last_seen, present, quantity)
+                    VALUES (?, ?, 1, ?, 1, ?)
+                    ON CONFLICT (address, item) DO UPDATE SET
+                        times_seen = times_seen + 1,
+                        last_seen = excluded.last_seen,
+                        present = 1,
+                        quantity = excluded.quantity
+                    """,
+                    [(address, item, seen_at, quantity) for item, quantity in quantities.items()]
+                )
+                self._db.executemany(
+                    "UPDATE item_stats SET present = 0, quantity = 0 WHERE address = ? AND item = ?",
+                    [(address, change["name"]) for change in changes["removed"]]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return changes
+
+    def items(self, address: str) -> List[Dict[str, Any]]:
+        """Items currently in the wallet's pantry"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT item, quantity, last_seen FROM item_stats "
+                "WHERE address = ? AND present = 1 ORDER BY item",
+                (address.lower(),)
+            ).fetchall()
+        return [
+            {"name": row["item"], "quantity": row["quantity"], "last_seen": row["last_seen"]}
+            for row in rows
+        ]
+
+    def record_purchases(self, address: str, items: Iterable[str], bought_at: Optional[float] = None) -> None:
+        """Count one purchase of each item"""
+        bought_at = bought_at or time.time()
+        rows = [(address.lower(), item, bought_at) for item in set(items)]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany(
+                """
+                INSERT INTO item_stats (address, item, times_bought, last_bought) VALUES (?, ?, 1, ?)
+                ON CONFLICT (address, item) DO UPDATE SET
+                    times_bought = times_bought + 1,
+                    last_bought = excluded.last_bought
+                """,
+                rows
+            )
+
+    def purchase_counts(self, address: str) -> Dict[str, int]:
+        """Item name -> number of purchases for a wallet"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT item, times_bought FROM item_stats WHERE address = ? AND times_bought > 0",
+                (address.lower(),)
+            ).fetchall()
+        return {row["item"]: row["times_bought"] for row in rows}
+
+    def reserve_list(self, address: str, fingerprint: str, lease: float) -> Tuple[str, Optional[str]]:
+        """
+        Decide atomically who stores a wallet's grocery list:
+        ("stored", cid) if this list is already on IPFS, ("pending", None) while
+        another upload of it is in flight, or ("reserved", None) if the caller
+        should store it and then call set_last_list (or release_list on failure).
+        A reservation older than lease seconds is taken over.
+        """
+        address = address.lower()
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT fingerprint, cid, stored_at FROM last_list WHERE address = ?", (address,)
+                ).fetchone()
+                if row is not None and row["fingerprint"] == fingerprint:
+                    if row["cid"] is not None:
+                        self._db.execute("COMMIT")
+                        return "stored", row["cid"]
+                    if now - row["stored_at"] < lease:
+                        self._db.execute("COMMIT")
+                        return "pending", None
+                self._db.execute(
+                    "INSERT OR REPLACE INTO last_list (address, fingerprint, cid, stored_at) VALUES (?, ?, NULL, ?)",
+                    (address, fingerprint, now)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return "reserved", None
+
+    def set_last_list(self, address: str, fingerprint: str, cid: str) -> None:
+        """Complete a reservation; a newer list reserved meanwhile is left alone"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE last_list SET cid = ?, stored_at = ? WHERE address = ? AND fingerprint = ?",
+                (cid, time.time(), address.lower(), fingerprint)
+            )
+
+    def release_list(self, address: str, fingerprint: str) -> None:
+        """Drop a reservation whose upload failed"""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM last_list WHERE address = ? AND fingerprint = ? AND cid IS NULL",
+                (address.lower(), fingerprint)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,119 @@
+"""
+Perceptual-hash cache for image analyses
+Near-duplicate photos (same fridge, slightly different shot) map to hashes a few
+bits apart, so earlier detections can be reused without another vision call
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+HASH_BITS = 64
+
+
+def dhash(image_data: bytes, hash_size: int = 8) -> int:
+    """
+    Difference hash: shrink to (hash_size + 1) x hash_size greyscale and record
+    whether each pixel is brighter than its right neighbour
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_data)) as image:
+        # JPEG decoders can scale down while decoding, which skips most of the work
+        image.draft("L", (hash_size * 8, hash_size * 8))
+        pixels = list(
+            image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).getdata()
+        )
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class PerceptualCache:
+    """
+    LRU cache of results keyed by wallet and 64-bit perceptual hash.
+
+    Lookups find the closest entry within max_distance bits using a
+    multi-index hash table: the hash is split into max_distance + 1 chunks,
+    and by the pigeonhole principle any match agrees exactly on at least one
+    chunk, so only entries sharing a chunk value are compared.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_distance: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "2048"))
+        if max_distance is None:
+            max_distance = int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "6"))
+        self.max_distance = max(0, min(max_distance, HASH_BITS - 1))
+        self._chunks = self._chunk_layout(self.max_distance + 1)
+        self._entries: "OrderedDict[Tuple[str, int], Any]" = OrderedDict()
+        self._index: Dict[Tuple[str, int, int], set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _chunk_layout(count: int) -> List[Tuple[int, int]]:
+        """(shift, mask) pairs splitting HASH_BITS into count near-equal chunks"""
+        layout = []
+        shift = 0
+        for i in range(count):
+            width = HASH_BITS // count + (1 if i < HASH_BITS % count else 0)
+            layout.append((shift, (1 << width) - 1))
+            shift += width
+        return layout
+
+    def _keys(self, wallet: str, value: int):
+        for i, (shift, mask) in enumerate(self._chunks):
+            yield (wallet, i, (value >> shift) & mask)
+
+    def get(self, wallet: str, value: int) -> Optional[Any]:
+        """Cached result for the nearest hash within max_distance, if any"""
+        wallet = wallet.lower()
+        with self._lock:
+            best = None
+            best_distance = self.max_distance + 1
+            for key in self._keys(wallet, value):
+                for candidate in self._index.get(key, ()):
+                    distance = bin(candidate ^ value).count("1")
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end((wallet, best))
+            return self._entries[(wallet, best)]
+
+    def set(self, wallet: str, value: int, result: Any) -> None:
+        wallet = wallet.lower()
+        with self._lock:
+            if (wallet, value) in self._entries:
+                self._entries.move_to_end((wallet, value))
+                self._entries[(wallet, value)] = result
+                return
+            self._entries[(wallet, value)] = result
+            for key in self._keys(wallet, value):
+                self._index.setdefault(key, set()).add(value)
+            while len(self._entries) > self.max_entries:
+                (old_wallet, old_value), _ = self._entries.popitem(last=False)
+                for key in self._keys(old_wallet, old_value):
+                    bucket = self._index.get(key)
+                    if bucket is not None:
+                        bucket.discard(old_value)
+                        if not bucket:
+                            del self._index[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
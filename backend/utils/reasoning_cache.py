@@ -0,0 +1,162 @@
+"""
+Content-keyed cache for Dobby reasoning outputs
+In-memory LRU with a byte cap and TTL, plus an optional SQLite tier that survives restarts
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.db import connect
+from utils.model_registry import get_model_registry
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so re-indented f-string prompts share a key"""
+    return " ".join(prompt.split())
+
+
+class ReasoningCache:
+    """LRU/TTL cache keyed on normalized prompt plus generation parameters"""
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        cache_sampled: Optional[bool] = None,
+        path: Optional[str] = None
+    ):
+        self.max_bytes = max_bytes or int(os.getenv("DOBBY_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+        self.ttl = ttl or float(os.getenv("DOBBY_CACHE_TTL", "3600"))
+        if cache_sampled is None:
+            # Sampling is on by default, so sampled outputs are cached by default too;
+            # a repeated prompt then returns the same text until the entry expires
+            cache_sampled = os.getenv("DOBBY_CACHE_SAMPLED", "true").lower() in ("1", "true", "yes")
+        self.cache_sampled = cache_sampled
+        self.path = path if path is not None else os.getenv("DOBBY_CACHE_PATH")
+
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db = None
+        if self.path:
+            try:
+                self._db = connect(self.path)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS reasoning_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.execute("DELETE FROM reasoning_cache WHERE expires_at < ?", (time.time(),))
+            except Exception as e:
+                print(f"Reasoning cache disk tier disabled: {e}")
+                self._db = None
+
+    def key_for(self, prompt: str, max_length: Optional[int] = None) -> Optional[str]:
+        """
+        Build the cache key for a generation
+        Returns None when the generation is sampled and sampled outputs are not cached
+        """
+        registry = get_model_registry()
+        params: Dict[str, Any] = registry.generation_kwargs(max_length)
+        if params.get("do_sample") and not self.cache_sampled:
+            return None
+        params["model"] = registry.config.model_id
+        params["prompt"] = normalize_prompt(prompt)
+        encoded = json.dumps(params, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                self._remove(key)
+
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM reasoning_cache WHERE key = ?", (key,)
+                    ).fetchone()
+            except Exception as e:
+                print(f"Reasoning cache read error: {e}")
+                row = None
+            if row is not None and row["expires_at"] >= now:
+                with self._lock:
+                    self._insert(key, row["value"], row["expires_at"])
+                    self.stats["disk_hits"] += 1
+                return row["value"]
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._insert(key, value, expires_at)
+
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO reasoning_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at)
+                    )
+            except Exception as e:
+                print(f"Reasoning cache write error: {e}")
+
+    def _insert(self, key: str, value: str, expires_at: float) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, expires_at)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value.encode("utf-8"))
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["disk_hits"]) / lookups if lookups else 0.0
+        return {
+            **self.stats,
+            "hit_rate": round(hit_rate, 4),
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "disk": self._db is not None
+        }
+
+
+_cache: Optional[ReasoningCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_reasoning_cache() -> ReasoningCache:
+    """Return the process-wide reasoning cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReasoningCache()
+    return _cache
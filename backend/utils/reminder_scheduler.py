@@ -0,0 +1,110 @@
+"""
+Due-time scheduler for reminders
+Sleeps until the earliest pending deadline in the store's due index, then
+claims due reminders in batches and hands them to a dispatch callback
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.reminder_store import ReminderStore
+
+DispatchCallback = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class ReminderScheduler:
+    """
+    Delivers reminders when they come due.
+
+    The store's partial index on fire time acts as the priority queue, so the
+    scheduler holds nothing per reminder in memory and never scans. Claims are
+    atomic with a lease, so several worker processes can run schedulers
+    against one database, and reminders claimed by a process that died are
+    picked up again once the lease runs out (including after a restart).
+    """
+
+    def __init__(self, store: ReminderStore, dispatch: Optional[DispatchCallback] = None):
+        self.store = store
+        self.dispatch = dispatch
+        self.batch_size = int(os.getenv("REMINDER_BATCH_SIZE", "100"))
+        self.lease = float(os.getenv("REMINDER_LEASE_SECONDS", "60"))
+        # Other processes can insert earlier deadlines without waking us
+        self.max_sleep = float(os.getenv("REMINDER_MAX_SLEEP", "30"))
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next_wake: Optional[float] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {"dispatched": 0, "batches": 0, "failed_batches": 0}
+
+    def start(self) -> None:
+        """Start the scheduler loop; does nothing until a dispatch callback is set"""
+        if self._worker is not None or self.dispatch is None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def notify(self, due_at: Optional[float]) -> None:
+        """Wake the loop early if a new reminder is due before its current deadline"""
+        if due_at is None or self._wakeup is None:
+            return
+        if self._next_wake is None or due_at < self._next_wake:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while True:
+            now = time.time()
+            try:
+                next_due = await asyncio.to_thread(self.store.next_due)
+            except Exception as e:
+                print(f"Reminder scheduler error: {e}")
+                next_due = None
+
+            if next_due is not None and next_due <= now:
+                await self._dispatch_due(now)
+                continue
+
+            delay = self.max_sleep if next_due is None else min(next_due - now, self.max_sleep)
+            self._next_wake = now + delay
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._next_wake = None
+
+    async def _dispatch_due(self, now: float) -> None:
+        try:
+            batch = await asyncio.to_thread(self.store.claim_due, now, self.batch_size, self.lease)
+        except Exception as e:
+            print(f"Reminder scheduler error: {e}")
+            await asyncio.sleep(1)
+            return
+        if not batch:
+            return
+
+        try:
+            await asyncio.wait_for(self.dispatch(batch), timeout=self.lease)
+        except Exception as e:
+            # Leave the claims in place; the lease expiry makes them due again
+            print(f"Reminder dispatch failed for {len(batch)} reminders: {e}")
+            self.stats["failed_batches"] += 1
+            return
+
+        try:
+            await asyncio.to_thread(self.store.mark_notified, [r["id"] for r in batch], time.time())
+        except Exception as e:
+            print(f"Reminder scheduler error: {e}")
+        self.stats["dispatched"] += len(batch)
+        self.stats["batches"] += 1
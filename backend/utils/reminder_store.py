@@ -0,0 +1,255 @@
+"""
+Persistent reminders store
+SQLite by default so reminders survive restarts and are shared by every worker
+process; other backends can be registered in STORE_BACKENDS
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.db import connect, data_path
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    address TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    datetime TEXT,
+    due_at REAL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    cid TEXT,
+    fire_at REAL,
+    notified_at REAL
+);
+CREATE INDEX IF NOT EXISTS reminders_by_address ON reminders (address, seq);
+-- fire_at starts as the due time and is pushed forward by a lease while a
+-- scheduler dispatches the reminder; only undelivered reminders are indexed
+CREATE INDEX IF NOT EXISTS reminders_pending_due ON reminders (fire_at)
+    WHERE completed = 0 AND notified_at IS NULL;
+"""
+
+
+
+def parse_due_time(datetime_str: str) -> Optional[float]:
+    """
+    Epoch seconds for an ISO reminder time, None if unparseable
+    Naive times are UTC, matching how reminders are written to Google Calendar
+    """
+    if not datetime_str:
+        return None
+    try:
+        due = datetime.fromisoformat(datetime_str.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if due.tzinfo is None:
+        due = due.replace(tzinfo=timezone.utc)
+    return due.timestamp()
+
+
+class ReminderStore(ABC):
+    """Interface every reminders backend implements"""
+
+    @abstractmethod
+    def create(self, reminder: Dict[str, Any]) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def get(self, reminder_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def list(
+        self,
+        address: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of an address's reminders in creation order, plus the next cursor"""
+        pass
+
+    @abstractmethod
+    def delete(self, address: str, reminder_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def complete(self, address: str, reminder_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def update(self, reminder_id: str, title: str, description: str, datetime_str: str) -> bool:
+        """Change a reminder's details; a new due time makes it deliverable again"""
+        pass
+
+    @abstractmethod
+    def set_cid(self, reminder_id: str, cid: str) -> None:
+        pass
+
+    @abstractmethod
+    def next_due(self) -> Optional[float]:
+        """Earliest fire time among undelivered reminders"""
+        pass
+
+    @abstractmethod
+    def claim_due(self, now: float, limit: int, lease: float) -> List[Dict[str, Any]]:
+        """
+        Atomically claim up to limit reminders due by now for delivery.
+        Claimed reminders are hidden from other schedulers for lease seconds,
+        after which they become due again unless marked notified.
+        """
+        pass
+
+    @abstractmethod
+    def mark_notified(self, reminder_ids: List[str], now: float) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteReminderStore(ReminderStore):
+    """Reminders indexed by id, (address, creation order) and pending due time"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("REMINDERS_DB_PATH") or data_path("reminders.sqlite3")
+        self._db = connect(self.path)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _row_to_reminder(row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "description": row["description"],
+            "datetime": row["datetime"],
+            "completed": bool(row["completed"]),
+            "created_at": row["created_at"],
+            "address": row["address"],
+            "cid": row["cid"]
+        }
+
+    def create(self, reminder: Dict[str, Any]) -> Dict[str, Any]:
+        due_at = parse_due_time(reminder.get("datetime", ""))
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO reminders (id, address, title, description, datetime, due_at, "
+                "completed, created_at, cid, fire_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    reminder["id"],
+                    reminder["address"],
+                    reminder.get("title", ""),
+                    reminder.get("description", ""),
+                    reminder.get("datetime", ""),
+                    due_at,
+                    int(bool(reminder.get("completed"))),
+                    reminder["created_at"],
+                    reminder.get("cid"),
+                    due_at
+                )
+            )
+        return reminder
+
+    def get(self, reminder_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM reminders WHERE id = ?", (reminder_id,)).fetchone()
+        return self._row_to_reminder(row) if row else None
+
+    def list(
+        self,
+        address: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = int(cursor) if cursor else 0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM reminders WHERE address = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (address, after, limit + 1)
+            ).fetchall()
+        next_cursor = str(rows[limit - 1]["seq"]) if len(rows) > limit else None
+        return [self._row_to_reminder(row) for row in rows[:limit]], next_cursor
+
+    def delete(self, address: str, reminder_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM reminders WHERE id = ? AND address = ?", (reminder_id, address)
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, address: str, reminder_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE reminders SET completed = 1 WHERE id = ? AND address = ? RETURNING *",
+                (reminder_id, address)
+            ).fetchone()
+        return self._row_to_reminder(row) if row else None
+
+    def update(self, reminder_id: str, title: str, description: str, datetime_str: str) -> bool:
+        due_at = parse_due_time(datetime_str)
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE reminders SET title = ?, description = ?, "
+                "fire_at = CASE WHEN due_at IS ? THEN fire_at ELSE ? END, "
+                "notified_at = CASE WHEN due_at IS ? THEN notified_at ELSE NULL END, "
+                "datetime = ?, due_at = ? WHERE id = ?",
+                (title, description, due_at, due_at, due_at, datetime_str, due_at, reminder_id)
+            )
+        return cursor.rowcount > 0
+
+    def set_cid(self, reminder_id: str, cid: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE reminders SET cid = ? WHERE id = ?", (cid, reminder_id))
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fire_at FROM reminders WHERE completed = 0 AND notified_at IS NULL "
+                "AND fire_at IS NOT NULL ORDER BY fire_at LIMIT 1"
+            ).fetchone()
+        return row["fire_at"] if row else None
+
+    def claim_due(self, now: float, limit: int, lease: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "UPDATE reminders SET fire_at = ? WHERE seq IN ("
+                "SELECT seq FROM reminders WHERE completed = 0 AND notified_at IS NULL "
+                "AND fire_at <= ? ORDER BY fire_at LIMIT ?) RETURNING *",
+                (now + lease, now, limit)
+            ).fetchall()
+        return [self._row_to_reminder(row) for row in rows]
+
+    def mark_notified(self, reminder_ids: List[str], now: float) -> None:
+        if not reminder_ids:
+            return
+        with self._lock:
+            self._db.executemany(
+                "UPDATE reminders SET notified_at = ? WHERE id = ?",
+                [(now, reminder_id) for reminder_id in reminder_ids]
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+STORE_BACKENDS = {
+    "sqlite": SQLiteReminderStore,
+}
+
+
+def create_reminder_store(backend: Optional[str] = None) -> ReminderStore:
+    """Build the configured reminders backend (REMINDERS_STORE, default sqlite)"""
+    backend = backend or os.getenv("REMINDERS_STORE", "sqlite")
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown reminders store: {backend}")
+    return STORE_BACKENDS[backend]()
@@ -0,0 +1,152 @@
+"""
+Service container for shared external clients
+Each client is created once per process and injected into every agent
+"""
+
+import inspect
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class ServiceContainer:
+    """
+    Lazily builds and caches service clients.
+
+    Agents and both servers ask the container for clients instead of
+    constructing their own, so credentials are loaded and connections are
+    opened once. startup() and shutdown() are wired into the FastAPI lifespan.
+    """
+
+    def __init__(self):
+        self._instances: Dict[str, Any] = {}
+        # Reentrant: a factory may resolve the services it depends on
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = factory()
+                    self._instances[name] = instance
+        return instance
+
+    @property
+    def ipfs(self):
+        from utils.ipfs import IPFSStorage
+        return self._get("ipfs", IPFSStorage)
+
+    @property
+    def twilio(self):
+        from utils.twilio_client import TwilioClient
+        return self._get("twilio", TwilioClient)
+
+    @property
+    def calendar(self):
+        from utils.google_calendar import GoogleCalendarClient
+        return self._get("calendar", GoogleCalendarClient)
+
+    @property
+    def calendar_sync(self):
+        from utils.calendar_sync import CalendarSyncEngine
+        return self._get("calendar_sync", lambda: CalendarSyncEngine(self.calendar.service))
+
+    @property
+    def covalent(self):
+        from utils.covalent import CovalentClient
+        return self._get("covalent", CovalentClient)
+
+    @property
+    def tx_store(self):
+        from utils.tx_store import TransactionStore
+        return self._get("tx_store", TransactionStore)
+
+    @property
+    def reminder_store(self):
+        from utils.reminder_store import create_reminder_store
+        return self._get("reminder_store", create_reminder_store)
+
+    @property
+    def reminder_scheduler(self):
+        from utils.reminder_scheduler import ReminderScheduler
+        return self._get("reminder_scheduler", lambda: ReminderScheduler(self.reminder_store))
+
+    @property
+    def outbox(self):
+        from utils.outbox import create_outbox
+        return self._get("outbox", lambda: create_outbox(self))
+
+    @property
+    def exa(self):
+        from utils.exa_vision import ExaVisionClient
+        return self._get("exa", ExaVisionClient)
+
+    @property
+    def image_cache(self):
+        from utils.perceptual_cache import PerceptualCache
+        return self._get("image_cache", PerceptualCache)
+
+    @property
+    def pantry_store(self):
+        from utils.pantry_store import PantryStore
+        return self._get("pantry_store", PantryStore)
+
+    @property
+    def enclave(self):
+        from utils.enclave import MockEnclave
+        return self._get("enclave", MockEnclave)
+
+    async def startup(self) -> None:
+        """
+        Create the lightweight clients up front so the first request does not pay for them.
+        Twilio and Calendar import their SDKs on first use and are left out.
+        """
+        for name in ("ipfs", "covalent", "exa", "enclave", "outbox"):
+            try:
+                getattr(self, name)
+            except Exception as e:
+                print(f"Service startup error ({name}): {e}")
+
+        for name, instance in list(self._instances.items()):
+            start = getattr(instance, "start", None)
+            if start is None:
+                continue
+            try:
+                result = start()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"Service startup error ({name}): {e}")
+
+    async def shutdown(self) -> None:
+        """Close clients that hold connections and stop the inference workers"""
+        # Reverse creation order so background workers stop before the stores they use
+        for name, instance in reversed(list(self._instances.items())):
+            close = getattr(instance, "close", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"Service shutdown error ({name}): {e}")
+        self._instances.clear()
+
+        from utils.inference import get_inference_executor
+        get_inference_executor().shutdown()
+
+
+_services: Optional[ServiceContainer] = None
+_services_lock = threading.Lock()
+
+
+def get_services() -> ServiceContainer:
+    """Return the process-wide service container"""
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = ServiceContainer()
+    return _services
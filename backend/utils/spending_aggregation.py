@@ -0,0 +1,136 @@
+"""
+Columnar spending aggregation
+Per-category and per-day totals computed with one NumPy group-by each
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+
+@dataclass
+class SpendingSummary:
+    """Aggregated spending, already in the shape returned by the API"""
+    transactions: List[Dict[str, Any]]
+    total_spent: float
+    categories: Dict[str, float]
+    chart_data: List[Dict[str, Any]]
+
+
+def transaction_values(transactions: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Transaction values as a float64 column"""
+    return np.fromiter(
+        (float(tx.get("value", 0)) for tx in transactions),
+        dtype=np.float64,
+        count=len(transactions)
+    )
+
+
+def transaction_dates(transactions: Sequence[Dict[str, Any]]) -> List[str]:
+    """YYYY-MM-DD of each transaction; a missing timestamp counts as today"""
+    today = datetime.now().isoformat()
+    return [tx.get("timestamp", today)[:10] for tx in transactions]
+
+
+def group_sum(labels: Sequence[str], values: np.ndarray, first_seen_order: bool = False) -> Dict[str, float]:
+    """
+    Sum values per label with a single bincount
+    Labels come back sorted, or in order of first appearance if requested
+    """
+    if len(labels) == 0:
+        return {}
+    uniques, first_index, codes = np.unique(
+        np.asarray(labels, dtype=object).astype(str),
+        return_index=True,
+        return_inverse=True
+    )
+    totals = np.bincount(codes, weights=values, minlength=len(uniques))
+    order = np.argsort(first_index, kind="stable") if first_seen_order else range(len(uniques))
+    return {str(uniques[i]): float(totals[i]) for i in order}
+
+
+def daily_chart(dates: Sequence[str], values: np.ndarray) -> List[Dict[str, Any]]:
+    """Chart points of total spending per day, sorted by date"""
+    return [
+        {"date": date, "amount": amount}
+        for date, amount in group_sum(dates, values).items()
+    ]
+
+
+def aggregate_spending(
+    transactions: Sequence[Dict[str, Any]],
+    categories: Sequence[str]
+) -> SpendingSummary:
+    """
+    Aggregate classified transactions
+    categories[i] is the category of transactions[i]
+    """
+    values = transaction_values(transactions)
+    category_totals = group_sum(categories, values, first_seen_order=True)
+    chart_data = daily_chart(transaction_dates(transactions), values)
+
+    classified = [
+        {**tx, "category": category, "value": value}
+        for tx, category, value in zip(transactions, categories, values.tolist())
+    ]
+
+    return SpendingSummary(
+        transactions=classified,
+        total_spent=float(values.sum()),
+        categories=category_totals,
+        chart_data=chart_data
+    )
+
+
+class RunningTotals:
+    """
+    Category and daily totals merged page by page for streaming analysis
+    Transactions are counted once per (chain, hash), so pages that re-sync
+    already stored history do not inflate the totals
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_spent = 0.0
+        self.categories: Dict[str, float] = {}
+        self.daily: Dict[str, float] = {}
+        self._seen: set = set()
+
+    def add(self, transactions: Sequence[Dict[str, Any]], categories: Sequence[str]) -> int:
+        """Fold one page of classified transactions into the totals; returns how many were new"""
+        fresh = []
+        for tx, category in zip(transactions, categories):
+            key = (tx.get("chain_id"), tx.get("hash"))
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            fresh.append((tx, category))
+        if not fresh:
+            return 0
+        transactions = [tx for tx, _ in fresh]
+        categories = [category for _, category in fresh]
+
+        values = transaction_values(transactions)
+        for category, amount in group_sum(categories, values, first_seen_order=True).items():
+            self.categories[category] = self.categories.get(category, 0.0) + amount
+        for date, amount in group_sum(transaction_dates(transactions), values).items():
+            self.daily[date] = self.daily.get(date, 0.0) + amount
+        self.total_spent += float(values.sum())
+        self.count += len(transactions)
+        return len(transactions)
+
+    def event(self, **extra: Any) -> Dict[str, Any]:
+        """Progress event with the current totals"""
+        return {
+            "type": "progress",
+            **extra,
+            "transactionCount": self.count,
+            "totalSpent": self.total_spent,
+            "categories": dict(self.categories),
+            "chartData": [
+                {"date": date, "amount": amount}
+                for date, amount in sorted(self.daily.items())
+            ]
+        }
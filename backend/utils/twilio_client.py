@@ -3,7 +3,8 @@ Twilio SMS client for reminder notifications
 """
 
 import os
-from twilio.rest import Client as TwilioRestClient
+import asyncio
+import threading
 
 class TwilioClient:
     """Handle SMS notifications via Twilio"""
@@ -12,13 +13,22 @@ class TwilioClient:
         self.account_sid = os.getenv("TWILIO_SID")
         self.auth_token = os.getenv("TWILIO_TOKEN")
         self.from_number = os.getenv("TWILIO_FROM_NUMBER", "+1234567890")
+        self._client = None
+        self._client_lock = threading.Lock()
         
-        if self.account_sid and self.auth_token:
-            self.client = TwilioRestClient(self.account_sid, self.auth_token)
-        else:
-            self.client = None
+        if not (self.account_sid and self.auth_token):
             print("Warning: Twilio credentials not set, SMS disabled")
     
+    @property
+    def client(self):
+        """Twilio REST client, created on the first SMS so the SDK is not imported at startup"""
+        if self._client is None and self.account_sid and self.auth_token:
+            with self._client_lock:
+                if self._client is None:
+                    from twilio.rest import Client as TwilioRestClient
+                    self._client = TwilioRestClient(self.account_sid, self.auth_token)
+        return self._client
+    
     async def send_reminder_sms(self, to: str, message: str) -> bool:
         """Send SMS reminder"""
         if not self.client:
@@ -26,7 +36,9 @@ class TwilioClient:
             return True
         
         try:
-            message = self.client.messages.create(
+            # The Twilio SDK is blocking; keep it off the event loop
+            message = await asyncio.to_thread(
+                self.client.messages.create,
                 body=message,
                 from_=self.from_number,
                 to=to
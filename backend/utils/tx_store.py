@@ -0,0 +1,155 @@
+"""
+Local per-wallet transaction store with block-height checkpoints
+Lets spending analysis fetch only transactions newer than the last sync
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.covalent import parse_timestamp, to_epoch
+from utils.db import connect, data_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    address TEXT NOT NULL,
+    chain_id INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    block_height INTEGER,
+    signed_at REAL,
+    timestamp TEXT,
+    value REAL NOT NULL,
+    from_address TEXT,
+    to_address TEXT,
+    description TEXT,
+    PRIMARY KEY (address, chain_id, hash)
+);
+CREATE INDEX IF NOT EXISTS transactions_by_time ON transactions (address, signed_at);
+-- backfill_page is where paging resumes when a sync was cut short before
+-- reaching backfill_after (the older checkpoint; NULL means the sync horizon)
+CREATE TABLE IF NOT EXISTS sync_state (
+    address TEXT NOT NULL,
+    chain_id INTEGER NOT NULL,
+    last_block INTEGER,
+    synced_at REAL NOT NULL,
+    backfill_page INTEGER,
+    backfill_after INTEGER,
+    PRIMARY KEY (address, chain_id)
+);
+"""
+
+
+class TransactionStore:
+    """SQLite index of fetched transactions plus the last synced block per wallet/chain"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("TX_STORE_PATH") or data_path("transactions.sqlite3")
+        self._db = connect(self.path)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def checkpoints(self, address: str) -> Dict[int, Dict[str, Any]]:
+        """Last synced block, sync time and pending backfill for each chain of an address"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT chain_id, last_block, synced_at, backfill_page, backfill_after "
+                "FROM sync_state WHERE address = ?",
+                (address.lower(),)
+            ).fetchall()
+        return {
+            row["chain_id"]: {
+                "last_block": row["last_block"],
+                "synced_at": row["synced_at"],
+                "backfill_page": row["backfill_page"],
+                "backfill_after": row["backfill_after"]
+            }
+            for row in rows
+        }
+
+    def add_transactions(self, address: str, chain_id: int, transactions: Iterable[Dict[str, Any]]) -> None:
+        """Insert or update a page of transactions"""
+        address = address.lower()
+        rows = [
+            (
+                address,
+                chain_id,
+                tx.get("hash", ""),
+                tx.get("block_height"),
+                parse_timestamp(tx.get("timestamp", "")),
+                tx.get("timestamp", ""),
+                float(tx.get("value", 0)),
+                tx.get("from", ""),
+                tx.get("to", ""),
+                tx.get("description", "")
+            )
+            for tx in transactions
+        ]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO transactions (address, chain_id, hash, block_height, "
+                    "signed_at, timestamp, value, from_address, to_address, description) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def set_checkpoint(self, address: str, chain_id: int, last_block: Optional[int]) -> None:
+        """Record a sync; last_block never moves backwards, and None leaves it unchanged"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sync_state (address, chain_id, last_block, synced_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (address, chain_id) DO UPDATE SET "
+                "last_block = MAX(COALESCE(excluded.last_block, 0), COALESCE(sync_state.last_block, 0)), "
+                "synced_at = excluded.synced_at",
+                (address.lower(), chain_id, last_block, time.time())
+            )
+
+    def set_backfill(
+        self,
+        address: str,
+        chain_id: int,
+        page: Optional[int],
+        after_block: Optional[int] = None
+    ) -> None:
+        """Record where an unfinished backfill resumes; page None marks it done"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sync_state (address, chain_id, synced_at, backfill_page, backfill_after) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (address, chain_id) DO UPDATE SET "
+                "backfill_page = excluded.backfill_page, backfill_after = excluded.backfill_after",
+                (address.lower(), chain_id, time.time(), page, after_block if page is not None else None)
+            )
+
+    def query(self, address: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+        """Transactions for an address inside [start_date, end_date], newest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM transactions WHERE address = ? AND signed_at BETWEEN ? AND ? "
+                "ORDER BY signed_at DESC",
+                (address.lower(), to_epoch(start_date), to_epoch(end_date))
+            ).fetchall()
+        return [
+            {
+                "hash": row["hash"],
+                "value": row["value"],
+                "timestamp": row["timestamp"],
+                "from": row["from_address"],
+                "to": row["to_address"],
+                "description": row["description"],
+                "chain_id": row["chain_id"],
+                "block_height": row["block_height"]
+            }
+            for row in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()